@@ -6,7 +6,11 @@ from rasa_sdk.forms import Action
 from rasa_sdk.events import SlotSet, UserUtteranceReverted
 
 from common import metrics, logging
-from common.rasa.tracker import get_current_url, get_is_org_admin, get_is_internal
+from common.rasa.tracker import (
+    get_current_url,
+    get_events_summary,
+    get_identity_context,
+)
 
 from common.config import app
 
@@ -43,10 +47,14 @@ class ActionPreProcess(Action):
     async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict
     ) -> List[Dict[Text, Any]]:
-        logger.info(f"Received {len(tracker.events)} events in tracker")
+        events_summary = get_events_summary(tracker)
+        logger.info(
+            f"Received {events_summary.total - events_summary.dropped} of {events_summary.total} events in tracker"
+        )
         metrics.action_custom_action_count.labels(action_type=self.name()).inc()
 
         results = []
+        identity_context = get_identity_context(tracker)
 
         # Set the first_time_greeting slot to False on a user interaction
         if (
@@ -55,7 +63,7 @@ class ActionPreProcess(Action):
         ):
             results.append(SlotSet(_SLOT_FIRST_TIME_GREETING, False))
 
-        is_org_admin = get_is_org_admin(tracker)
+        is_org_admin = identity_context.is_org_admin
         if is_org_admin != tracker.get_slot(_SLOT_IS_ORG_ADMIN):
             results.append(SlotSet(_SLOT_IS_ORG_ADMIN, is_org_admin))
 
@@ -68,7 +76,7 @@ class ActionPreProcess(Action):
         if base_console_url != app.console_dot_base_url:
             results.append(SlotSet(_SLOT_BASE_CONSOLE_URL, app.console_dot_base_url))
 
-        is_internal = get_is_internal(tracker)
+        is_internal = identity_context.is_internal
         if is_internal != tracker.get_slot(_SLOT_IS_INTERNAL):
             results.append(SlotSet(_SLOT_IS_INTERNAL, is_internal))
 
@@ -16,7 +16,6 @@ from common.metrics import (
 )
 from common.requests import send_console_request
 
-
 logger = logging.initialize_logging()
 
 ACTIVATION_KEY_NAME = "inventory_activation_key_name"
@@ -64,20 +63,20 @@ class ValidateFormActivationKeyCreate(FormValidationAction):
         if requested_slot == ACTIVATION_KEY_NAME and name:
             # post to rhsm 	/api/rhsm/v2/activation_keys
             body = {"name": name, "role": "", "serviceLevel": "", "usage": ""}
-            response = await send_console_request(
+            response, content = await send_console_request(
                 "rhsm",
                 "/api/rhsm/v2/activation_keys",
                 tracker,
                 method="post",
                 json=body,
-                fetch_content=False,
             )
 
             if not response.ok:
                 # error json format: {"error":{"code":400,"message":"name should be present, unique and only contain letters, numbers, underscores, or hyphens"}}
-                error_json = await response.json()
-                error_message = error_json.get("error", {}).get(
-                    "message", "Unknown error"
+                error_message = (
+                    content.get("error", {}).get("message", "Unknown error")
+                    if isinstance(content, dict)
+                    else "Unknown error"
                 )
                 dispatcher.utter_message(
                     response="utter_inventory_create_activation_key_failure_1"
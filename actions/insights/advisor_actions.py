@@ -15,7 +15,7 @@ from actions.actions import all_required_slots_are_set
 from actions.slot_match import FuzzySlotMatch, FuzzySlotMatchOption, resolve_slot_match
 from common import logging
 from common.metrics import flow_started_count, Flow, flow_finished_count
-from common.requests import send_console_request
+from common.requests import send_console_request, CACHE_SCOPE_GLOBAL
 
 logger = logging.initialize_logging()
 
@@ -251,7 +251,10 @@ class AdvisorRecommendationByType(FormValidationAction):
         else:
             # Find the id of the category
             response, content = await send_console_request(
-                "advisor", "/api/insights/v1/rulecategory/", tracker
+                "advisor",
+                "/api/insights/v1/rulecategory/",
+                tracker,
+                cache_scope=CACHE_SCOPE_GLOBAL,
             )
 
             if not response.ok:
@@ -19,8 +19,7 @@ from common.metrics import (
     flow_finished_count,
     action_custom_action_count,
 )
-from common.requests import send_console_request
-
+from common.requests import send_console_request, CACHE_SCOPE_ORG
 
 logger = logging.initialize_logging()
 
@@ -204,6 +203,8 @@ class ValidateFormImageBuilderCustomContent(FormValidationAction):
             "content-sources",
             "/api/content-sources/v1/popular_repositories/?offset=0&limit=20",
             tracker,
+            # Tells which of the repositories the org already has
+            cache_scope=CACHE_SCOPE_ORG,
         )
 
         if not response.ok or not result or not result["data"]:
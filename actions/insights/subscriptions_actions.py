@@ -7,7 +7,7 @@ from rasa_sdk.types import DomainDict
 
 from actions.slot_match import FuzzySlotMatch, FuzzySlotMatchOption, resolve_slot_match
 from common import logging
-from common.requests import send_console_request
+from common.requests import send_console_request, CACHE_SCOPE_ORG
 
 logger = logging.initialize_logging()
 
@@ -57,7 +57,10 @@ class SubscriptionsCheck(Action):
                 break
 
         response, content = await send_console_request(
-            "rhsm", "/api/rhsm/v2/products/status", tracker
+            "rhsm",
+            "/api/rhsm/v2/products/status",
+            tracker,
+            cache_scope=CACHE_SCOPE_ORG,
         )
 
         if not response.ok:
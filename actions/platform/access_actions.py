@@ -9,7 +9,7 @@ from actions.actions import form_action_is_starting, form_action_is_finished
 from actions.insights.notifications import send_rbac_request_admin
 from common import logging
 from common.metrics import flow_started_count, Flow, flow_finished_count
-from common.rasa.tracker import get_decoded_user_identity
+from common.rasa.tracker import get_identity_context
 
 logger = logging.initialize_logging()
 
@@ -39,7 +39,7 @@ class ExecuteFormAccessRequestAccess(Action):
             ]
 
         try:
-            identity = get_decoded_user_identity(tracker)
+            identity = get_identity_context(tracker).decoded_identity
             email = identity["identity"]["user"]["email"]
             username = identity["identity"]["user"]["username"]
             org_id = identity["identity"]["org_id"]
@@ -139,7 +139,6 @@ class ActionAccessOrgID(Action):
     async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict
     ) -> List[Dict[Text, Any]]:
-        identity = get_decoded_user_identity(tracker)
-        org_id = identity["identity"]["org_id"]
+        org_id = get_identity_context(tracker).org_id
         dispatcher.utter_message(response="utter_access_org_id", org_id=org_id)
         return []
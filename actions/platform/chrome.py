@@ -1,7 +1,11 @@
 import json
 
 from actions.slot_match import FuzzySlotMatchOption
-from common.requests import send_console_request
+from common.requests import send_console_request, CACHE_SCOPE_GLOBAL
+
+GENERATED_SERVICES_PATH = (
+    "/api/chrome-service/v1/static/stable/prod/services/services-generated.json"
+)
 
 
 async def get_user(tracker):
@@ -62,9 +66,10 @@ def parse_generated_services(content):
 async def get_generated_services(tracker):
     return await send_console_request(
         "chrome-service",
-        "/api/chrome-service/v1/static/stable/prod/services/services-generated.json",
+        GENERATED_SERVICES_PATH,
         tracker,
         "get",
+        cache_scope=CACHE_SCOPE_GLOBAL,
     )
 
 
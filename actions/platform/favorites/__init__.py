@@ -1,4 +1,4 @@
-from typing import Dict, Text, Any
+from typing import Dict, Text, Any, Optional
 
 from rasa_sdk import FormValidationAction, Tracker, Action
 from rasa_sdk.executor import CollectingDispatcher
@@ -7,17 +7,38 @@ from rasa_sdk.types import DomainDict
 from actions.slot_match import (
     FuzzySlotMatch,
     FuzzySlotMatchOption,
+    SlotMatchCache,
     resolve_slot_match,
-    suggest_using_slot_match,
+    suggest_top_k,
 )
 from actions.platform.chrome import (
+    GENERATED_SERVICES_PATH,
     create_service_options,
 )
+from common.config import app
 
 _FAVE_SERVICE = "favorites_service"
 _FAVE_UNHAPPY = "favorites_unhappy"
 _FAVE_SUGGESTIONS = "favorites_suggestions"
 
+# Service matches by services catalog, the catalog is the same for every user
+services_match_cache = SlotMatchCache(
+    app.slot_match_cache_size,
+    ttl=app.slot_match_cache_ttl,
+    name="favorites_service_match",
+)
+
+
+async def _create_services_match(tracker: Tracker) -> Optional[FuzzySlotMatch]:
+    options = await create_service_options(tracker)
+    if not options:
+        return None
+
+    return FuzzySlotMatch(
+        _FAVE_SERVICE,
+        [FuzzySlotMatchOption(o["data"], o["synonyms"]) for o in options.values()],
+    )
+
 
 class AbstractFavoritesForm(FormValidationAction):
     def name(self) -> str:
@@ -33,30 +54,21 @@ class AbstractFavoritesForm(FormValidationAction):
             return {}
 
         message = tracker.latest_message.get("text")
-        options = await create_service_options(tracker)
-        fuzzy_options = [
-            *map(
-                lambda o: FuzzySlotMatchOption(o["data"]["title"], o["synonyms"]),
-                options.values(),
-            )
-        ]
-        match = FuzzySlotMatch(_FAVE_SERVICE, fuzzy_options)
+        match = await services_match_cache.get_or_create(
+            GENERATED_SERVICES_PATH, lambda: _create_services_match(tracker)
+        )
+        if match is None:
+            return None
+
         resolved = resolve_slot_match(message, match)
 
         if len(resolved) > 0:
-            return {_FAVE_SERVICE: options[resolved[_FAVE_SERVICE]]["data"]}
+            return {_FAVE_SERVICE: resolved[_FAVE_SERVICE]}
 
-        suggestions = suggest_using_slot_match(message, match, accepted_rate=10)
+        suggestions = suggest_top_k(message, match, 3, accepted_rate=10)
 
         if suggestions:
-            if len(suggestions) > 0:
-                suggestions = suggestions[:3]
-
-            return {
-                _FAVE_SUGGESTIONS: [
-                    *map(lambda s: options[s["value"]]["data"], suggestions)
-                ]
-            }
+            return {_FAVE_SUGGESTIONS: [*map(lambda s: s["value"], suggestions)]}
 
         return None
 
@@ -13,7 +13,11 @@ from actions.platform.integrations import (
     validate_integration_url,
 )
 from actions.slot_match import FuzzySlotMatch, FuzzySlotMatchOption, resolve_slot_match
-from common.requests import send_console_request
+from common.requests import (
+    send_console_request,
+    gather_console_requests,
+    ConsoleRequest,
+)
 from actions.actions import all_required_slots_are_set
 
 integration_edit_what_match = FuzzySlotMatch(
@@ -133,7 +137,7 @@ class IntegrationButtonBuilder:
         has_errors = False
 
         prepend_camel = lambda s: f"camel:{s}"
-        params = {
+        notifications_params = {
             "name": search,
             "type": [
                 "webhook",
@@ -145,17 +149,39 @@ class IntegrationButtonBuilder:
         }
 
         if enabled is not None:
-            params["active"] = str(enabled)
+            notifications_params["active"] = str(enabled)
+
+        sources_params = {
+            "filter[name][contains_i]": search,
+            "limit": MAX_NUMBER_OF_INTEGRATIONS,
+        }
+
+        if enabled is not None:
+            if enabled is True:
+                sources_params["filter[paused_at][nil]"] = "1"
+            else:
+                sources_params["filter[paused_at][not_nil]"] = "1"
 
-        response, content = await send_console_request(
-            "notifications",
-            f"/api/integrations/v1.0/endpoints",
+        notifications_result, sources_result = await gather_console_requests(
             tracker,
-            params=params,
+            ConsoleRequest(
+                "notifications",
+                f"/api/integrations/v1.0/endpoints",
+                params=notifications_params,
+                fields=["id", "name", "enabled", "type", "sub_type"],
+            ),
+            ConsoleRequest(
+                "sources",
+                f"/api/sources/v3.1/sources",
+                params=sources_params,
+                fields=["id", "name", "paused_at"],
+            ),
         )
+        notifications_response, notifications_content = notifications_result
+        sources_response, sources_content = sources_result
 
-        if response.ok:
-            for integration in content["data"]:
+        if notifications_response.ok:
+            for integration in notifications_content["data"]:
                 integrations.append(
                     {
                         "name": integration["name"],
@@ -168,23 +194,8 @@ class IntegrationButtonBuilder:
         else:
             has_errors = True
 
-        params = {
-            "filter[name][contains_i]": search,
-            "limit": MAX_NUMBER_OF_INTEGRATIONS,
-        }
-
-        if enabled is not None:
-            if enabled is True:
-                params["filter[paused_at][nil]"] = "1"
-            else:
-                params["filter[paused_at][not_nil]"] = "1"
-
-        response, content = await send_console_request(
-            "sources", f"/api/sources/v3.1/sources", tracker, params=params
-        )
-
-        if response.ok:
-            for integration in content["data"]:
+        if sources_response.ok:
+            for integration in sources_content["data"]:
                 integrations.append(
                     {
                         "name": integration["name"],
@@ -5,7 +5,12 @@ from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 from rasa_sdk.types import DomainDict
 
-from actions.slot_match import FuzzySlotMatch, FuzzySlotMatchOption, resolve_slot_match
+from actions.slot_match import (
+    FuzzySlotMatch,
+    FuzzySlotMatchOption,
+    SlotMatchCache,
+    resolve_slot_match,
+)
 from actions.platform.notifications import (
     _SLOT_IS_ORG_ADMIN,
     NOTIF_BUNDLE,
@@ -20,9 +25,9 @@ from actions.platform.notifications import (
 )
 
 from common import logging
+from common.config import app
 from common.header import Header
-from common.requests import send_console_request
-
+from common.requests import send_console_request, CACHE_SCOPE_GLOBAL
 
 logger = logging.initialize_logging()
 
@@ -49,9 +54,11 @@ service_match = FuzzySlotMatch(
     ],
 )
 
-event_match = FuzzySlotMatch(
-    NOTIF_EVENT,
-    [],
+# Event matches by bundle id
+event_match_cache = SlotMatchCache(
+    app.slot_match_cache_size,
+    ttl=app.slot_match_cache_ttl,
+    name="notifications_event_match",
 )
 
 event_opt_match = FuzzySlotMatch(
@@ -163,45 +170,56 @@ class ValidateFormNotifications(FormValidationAction):
         if not bundle:
             return {}
 
-        options = []
-        response, result = await get_available_events_by_bundle(tracker, bundle["id"])
-        if not response.ok or not result:
-            received_notifications_error(dispatcher, response, result)
-            return {"requested_slot": None}
-        for event in result["data"]:
-            possible_value = {
-                "id": event["id"],
-                "name": event["name"],
-                "display_name": event["display_name"],
-                "application_id": event["application_id"],
-                "application_name": event["application"]["name"],
-                "application_display_name": event["application"]["display_name"],
-            }
+        async def create_event_match() -> Optional[FuzzySlotMatch]:
+            response, result = await get_available_events_by_bundle(
+                tracker, bundle["id"]
+            )
+            if not response.ok or not result:
+                received_notifications_error(dispatcher, response, result)
+                return None
+
+            options = []
+            for event in result["data"]:
+                possible_value = {
+                    "id": event["id"],
+                    "name": event["name"],
+                    "display_name": event["display_name"],
+                    "application_id": event["application_id"],
+                    "application_name": event["application"]["name"],
+                    "application_display_name": event["application"]["display_name"],
+                }
+                options.append(
+                    FuzzySlotMatchOption(
+                        possible_value,
+                        [event["name"], event["display_name"], event["application_id"]],
+                    )
+                )
+
             options.append(
                 FuzzySlotMatchOption(
-                    possible_value,
-                    [event["name"], event["display_name"], event["application_id"]],
+                    UNSURE_SERVICE,
+                    [
+                        "Another service",
+                        "not listed",
+                        "unsure",
+                        "not sure",
+                        "idk",
+                        "I'm not sure",
+                        "no clue",
+                        "I have no idea",
+                        "other",
+                    ],
                 )
             )
 
-        options.append(
-            FuzzySlotMatchOption(
-                UNSURE_SERVICE,
-                [
-                    "Another service",
-                    "not listed",
-                    "unsure",
-                    "not sure",
-                    "idk",
-                    "I'm not sure",
-                    "no clue",
-                    "I have no idea",
-                    "other",
-                ],
-            )
+            return FuzzySlotMatch(NOTIF_EVENT, options)
+
+        event_match = await event_match_cache.get_or_create(
+            bundle["id"], create_event_match
         )
+        if event_match is None:
+            return {"requested_slot": None}
 
-        event_match.options = options
         resolved = resolve_slot_match(tracker.latest_message["text"], event_match)
         if len(resolved) > 0:
             return resolved
@@ -580,6 +598,7 @@ async def get_available_bundles(tracker: Tracker):
         "/api/notifications/v1.0/notifications/facets/bundles",
         tracker,
         params=params,
+        cache_scope=CACHE_SCOPE_GLOBAL,
     )
 
 
@@ -598,6 +617,9 @@ async def get_available_events_by_bundle(
         "/api/notifications/v1.0/notifications/eventTypes",
         tracker,
         params=params,
+        # Muted types change with mute_event during the same flow, only the full list is cached
+        cache_scope=None if exclude_muted_types else CACHE_SCOPE_GLOBAL,
+        fields=["id", "name", "display_name", "application_id", "application"],
     )
 
 
@@ -1,37 +1,190 @@
-from typing import List, Optional, Dict
-
-from rapidfuzz import fuzz
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from rapidfuzz import fuzz, process
+
+from common.cache import LRUCache
 
 ACCEPTED_RATIO = 80
 
 
 class FuzzySlotMatch:
-    slot: str
-    options: List["FuzzySlotMatchOption"]
+    """Immutable, so that its compiled index never goes stale: build a new one to change the options"""
 
-    def __init__(self, slot: str, options: List["FuzzySlotMatchOption"]):
-        self.slot = slot
-        self.options = options
+    def __init__(self, slot: str, options: Sequence["FuzzySlotMatchOption"]):
+        self._slot = slot
+        self._options = tuple(options)
+        self._compiled = None
 
+    @property
+    def slot(self) -> str:
+        return self._slot
 
-class FuzzySlotMatchOption:
-    value: str
-    synonyms: List[str]
-    sub_options: Optional[FuzzySlotMatch]
+    @property
+    def options(self) -> Tuple["FuzzySlotMatchOption", ...]:
+        return self._options
+
+    def compile(self) -> "CompiledSlotMatch":
+        """Flattened index of the options, built on first use"""
+        if self._compiled is None:
+            self._compiled = CompiledSlotMatch(self)
+
+        return self._compiled
 
+
+class FuzzySlotMatchOption:
     def __init__(
         self,
         value: str,
         synonyms: Optional[List[str]] = None,
         sub_options: Optional[FuzzySlotMatch] = None,
     ):
-        self.value = value
-        self.synonyms = (
-            [s.lower() for s in synonyms]
+        self._value = value
+        self._synonyms = (
+            tuple(s.lower() for s in synonyms)
             if synonyms is not None
-            else [self.value.lower()]
+            else (self._value.lower(),)
+        )
+        self._sub_options = sub_options
+
+    @property
+    def value(self) -> str:
+        return self._value
+
+    @property
+    def synonyms(self) -> Tuple[str, ...]:
+        return self._synonyms
+
+    @property
+    def sub_options(self) -> Optional[FuzzySlotMatch]:
+        return self._sub_options
+
+
+class CompiledSlotMatch:
+    """All the synonyms of a FuzzySlotMatch tree in a single list, in the order resolve_slot_match checks them
+    (each option's synonyms followed by its sub options). Every synonym keeps the slot path that resolves it.
+    """
+
+    synonyms: List[str]
+    paths: List[Tuple[Tuple[str, Any], ...]]
+    options: Tuple["FuzzySlotMatchOption", ...]
+    option_synonyms: List[str]
+    option_ids: List[int]
+
+    def __init__(self, slot_match: FuzzySlotMatch):
+        self.synonyms = []
+        self.paths = []
+        self._flatten(slot_match, ())
+
+        # Synonyms of the top level options only, used for the suggestions
+        self.options = slot_match.options
+        self.option_synonyms = []
+        self.option_ids = []
+        for option_id, option in enumerate(self.options):
+            self.option_synonyms.extend(option.synonyms)
+            self.option_ids.extend([option_id] * len(option.synonyms))
+        self._max_synonyms = max(
+            (len(option.synonyms) for option in self.options), default=0
+        )
+
+    def _flatten(
+        self, slot_match: FuzzySlotMatch, parent_path: Tuple[Tuple[str, Any], ...]
+    ):
+        for option in slot_match.options:
+            path = parent_path + ((slot_match.slot, option.value),)
+            for synonym in option.synonyms:
+                self.synonyms.append(synonym)
+                self.paths.append(path)
+
+            if option.sub_options is not None:
+                self._flatten(option.sub_options, path)
+
+    def resolve(
+        self, user_message: str, accepted_rate=ACCEPTED_RATIO
+    ) -> Dict[str, any]:
+        matches = process.extract(
+            user_message,
+            self.synonyms,
+            scorer=fuzz.QRatio,
+            score_cutoff=accepted_rate,
+            limit=None,
+        )
+        if not matches:
+            return {}
+
+        # The first accepted synonym wins, not the best scored one
+        return dict(self.paths[min(index for _, _, index in matches)])
+
+    def suggest(
+        self, user_message: str, k: Optional[int] = None, accepted_rate=ACCEPTED_RATIO
+    ) -> List[Dict[str, any]]:
+        """Best k options (all of them when k is None), scored by their best synonym.
+        Fetching the best k * max synonyms per option is enough to get k different options,
+        so the whole set of synonyms is never sorted.
+        """
+        if k is not None and k <= 0:
+            return []
+
+        matches = process.extract(
+            user_message,
+            self.option_synonyms,
+            scorer=fuzz.QRatio,
+            score_cutoff=accepted_rate,
+            limit=k * self._max_synonyms if k is not None else None,
         )
-        self.sub_options = sub_options
+
+        suggestions = {}  # avoiding duplicates, matches come sorted by ratio
+        for _, ratio, index in matches:
+            option_id = self.option_ids[index]
+            if option_id not in suggestions:
+                suggestions[option_id] = {
+                    "value": self.options[option_id].value,
+                    "ratio": ratio,
+                }
+                if len(suggestions) == k:
+                    break
+
+        return list(suggestions.values())
+
+
+class SlotMatchCache:
+    """Compiled slot matches built out of dynamic data (e.g. API responses), shared across users and turns.
+    Keys identify the data source the options were built from, e.g. the bundle id of the events.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: Optional[float] = None, name: Optional[str] = None
+    ):
+        self._cache = LRUCache(maxsize, ttl=ttl, name=name)
+
+    async def get_or_create(
+        self,
+        key: Hashable,
+        create: Callable[[], Awaitable[Optional[FuzzySlotMatch]]],
+    ) -> Optional[FuzzySlotMatch]:
+        """Returns the cached slot match or creates, compiles and caches a new one.
+        Nothing is cached when `create` returns None (e.g. the API call failed).
+        """
+        slot_match = self._cache.get(key)
+        if slot_match is None:
+            slot_match = await create()
+            if slot_match is not None:
+                slot_match.compile()
+                self._cache.set(key, slot_match)
+
+        return slot_match
+
+    def clear(self) -> None:
+        self._cache.clear()
 
 
 def _sanitize_input(user_message: str) -> str:
@@ -41,40 +194,24 @@ def _sanitize_input(user_message: str) -> str:
 def resolve_slot_match(
     user_message: str, slot_match: FuzzySlotMatch, accepted_rate=ACCEPTED_RATIO
 ) -> Dict[str, any]:
-    user_message = _sanitize_input(user_message)
-    for options in slot_match.options:
-        for value in options.synonyms:
-            ratio = fuzz.QRatio(user_message, value)
-            if ratio >= accepted_rate:
-                return {slot_match.slot: options.value}
-
-        if options.sub_options is not None:
-            resolved_child = resolve_slot_match(
-                user_message, options.sub_options, accepted_rate=accepted_rate
-            )
-
-            if len(resolved_child) > 0:
-                resolved_child[slot_match.slot] = options.value
-                return resolved_child
-
-    return {}
+    return slot_match.compile().resolve(
+        _sanitize_input(user_message), accepted_rate=accepted_rate
+    )
 
 
 def suggest_using_slot_match(
     user_message: str, slot_match: FuzzySlotMatch, accepted_rate=ACCEPTED_RATIO
 ) -> List[str]:
-    user_message = _sanitize_input(user_message)
-    suggestions = {}  # avoiding duplicates
-    for option in slot_match.options:
-        for synonym in option.synonyms:
-            ratio = fuzz.QRatio(user_message, synonym)
-            if ratio >= accepted_rate:
-                suggestions[option.value] = {
-                    "value": option.value,
-                    "ratio": ratio,
-                }
-                break
-
-    suggestions = list(suggestions.values())
-    suggestions.sort(key=lambda x: x["ratio"], reverse=True)
-    return suggestions
+    return suggest_top_k(user_message, slot_match, None, accepted_rate=accepted_rate)
+
+
+def suggest_top_k(
+    user_message: str,
+    slot_match: FuzzySlotMatch,
+    k: Optional[int],
+    accepted_rate=ACCEPTED_RATIO,
+) -> List[Dict[str, any]]:
+    """Up to k suggestions ({"value", "ratio"}) sorted by ratio, one per top level option"""
+    return slot_match.compile().suggest(
+        _sanitize_input(user_message), k, accepted_rate=accepted_rate
+    )
@@ -11,6 +11,7 @@ from sanic.log import LOGGING_CONFIG_DEFAULTS
 
 from common import logging
 from common.config import app
+from common.rasa.remote_action import install_tracker_events_window
 
 from rasa.__main__ import main as rasa_main
 
@@ -56,6 +57,9 @@ def main():
     app.log_config()
     set_endpoints_config_variables()
 
+    if app.actions_tracker_events_window > 0:
+        install_tracker_events_window(app.actions_tracker_events_window)
+
     if app.prometheus is True:
         start_prometheus()
 
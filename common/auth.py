@@ -1,7 +1,12 @@
 from __future__ import annotations
-import requests
+import asyncio
+import time
+from typing import Set
+
+import aiohttp
 
 from common.config import app
+from common.singleflight import SingleFlight
 from .header import Header
 
 import jwt
@@ -10,29 +15,38 @@ from rasa_sdk import Tracker
 
 from common.rasa.tracker import get_user_identity
 
-local_dev_token: str | None = None
+# Tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 30
+# and in the background this many seconds earlier, so that requests don't wait for the refresh
+TOKEN_BACKGROUND_REFRESH_MARGIN = 30
 
 
-# if local token specified, it defaults to it
-def get_auth_header(tracker: Tracker, header: Header) -> Header:
-    global local_dev_token
+class DevToken:
+    """An access token and its expiry, decoded once when the token is obtained"""
 
-    if app.is_running_locally:
-        # if its already saved, use it
-        if local_dev_token is not None and _is_jwt_valid(local_dev_token):
-            header.add_header("Authorization", "Bearer " + local_dev_token)
-            return header
-        else:
-            local_dev_token = None
-
-        # need to set the offline token
-        offline_token = app.dev_offline_refresh_token
-        if offline_token is not None:
-            local_dev_token = _with_refresh_token(offline_token)
-            header.add_header("Authorization", "Bearer " + local_dev_token)
-            return header
+    token: str
+    expires_at: float | None
+
+    def __init__(self, token: str):
+        self.token = token
+        self.expires_at = _jwt_expiration(token)
+
+    def is_valid(self, now: float) -> bool:
+        return self.expires_at is None or now < self.expires_at - TOKEN_REFRESH_MARGIN
 
-        raise ValueError("No offline token found")
+
+local_dev_token: DevToken | None = None
+_token_refresh = SingleFlight()
+_scheduled_refresh: asyncio.TimerHandle | None = None
+_background_refreshes: Set[asyncio.Task] = set()
+
+
+# if local token specified, it defaults to it
+async def get_auth_header(tracker: Tracker, header: Header) -> Header:
+    if app.is_running_locally:
+        token = await _get_local_dev_token()
+        header.add_header("Authorization", "Bearer " + token)
+        return header
 
     identity = get_user_identity(tracker)
     if identity is not None:
@@ -42,37 +56,96 @@ def get_auth_header(tracker: Tracker, header: Header) -> Header:
     raise ValueError("No authentication found")
 
 
-def _with_refresh_token(refresh_token: str) -> str:
-    result = requests.post(
-        app.dev_sso_refresh_token_url,
-        data={
-            "grant_type": "refresh_token",
-            "client_id": "rhsm-api",
-            "refresh_token": refresh_token,
-        },
+async def _get_local_dev_token() -> str:
+    # if its already saved and not about to expire, use it
+    if local_dev_token is not None and local_dev_token.is_valid(time.time()):
+        return local_dev_token.token
+
+    # need to set the offline token
+    offline_token = app.dev_offline_refresh_token
+    if offline_token is None:
+        raise ValueError("No offline token found")
+
+    return (await _refresh_local_dev_token(offline_token)).token
+
+
+async def _refresh_local_dev_token(offline_token: str) -> DevToken:
+    global local_dev_token
+
+    # Concurrent requests share a single refresh
+    local_dev_token = await _token_refresh.do(
+        offline_token, lambda: _with_refresh_token(offline_token)
     )
+    _schedule_refresh(offline_token, local_dev_token)
+    return local_dev_token
 
-    if not result.ok:
-        raise "Unable to refresh token"
 
-    token = result.json()["access_token"]
-    _jwt_decode(token)
+def _schedule_refresh(offline_token: str, token: DevToken) -> None:
+    """Refreshes the token in the background before it needs to be refreshed by a request.
+    Tokens too short lived for it are only refreshed by the requests."""
+    global _scheduled_refresh
 
-    return token
+    if _scheduled_refresh is not None:
+        _scheduled_refresh.cancel()
+        _scheduled_refresh = None
 
+    if token.expires_at is None:
+        return
 
-def _is_jwt_valid(token: str) -> bool:
-    try:
-        # We want to know if the token expired
-        _jwt_decode(token)
-        return True
-    except jwt.InvalidTokenError:
-        return False
-
-
-def _jwt_decode(token: str) -> None:
-    # Skip signature check - token service is going to validate for us
-    jwt.decode(
-        token,
-        options={"verify_signature": False, "verify_exp": True, "verify_nbf": True},
+    delay = (
+        token.expires_at
+        - TOKEN_REFRESH_MARGIN
+        - TOKEN_BACKGROUND_REFRESH_MARGIN
+        - time.time()
     )
+    if delay > 0:
+        _scheduled_refresh = asyncio.get_running_loop().call_later(
+            delay, _refresh_in_background, offline_token
+        )
+
+
+def _refresh_in_background(offline_token: str) -> None:
+    task = asyncio.ensure_future(_refresh_local_dev_token(offline_token))
+    # Keeps the task alive until it is done, a failed refresh is retried by the next request
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def _with_refresh_token(refresh_token: str) -> DevToken:
+    try:
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=app.requests_timeout)
+        ) as session:
+            async with session.post(
+                app.dev_sso_refresh_token_url,
+                data={
+                    "grant_type": "refresh_token",
+                    "client_id": "rhsm-api",
+                    "refresh_token": refresh_token,
+                },
+            ) as result:
+                if not result.ok:
+                    raise ValueError(
+                        f"Unable to refresh token, status code: {result.status}"
+                    )
+
+                content = await result.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise ValueError(f"Unable to refresh token: {e!r}") from e
+
+    return DevToken(content["access_token"])
+
+
+def _jwt_expiration(token: str) -> float | None:
+    """Expiration time (exp) of the token, raises ValueError if it is invalid or already expired"""
+    try:
+        # Skip signature check - token service is going to validate for us
+        claims = jwt.decode(
+            token,
+            options={"verify_signature": False, "verify_exp": True, "verify_nbf": True},
+        )
+    except jwt.InvalidTokenError as e:
+        raise ValueError(f"Invalid token: {e}") from e
+
+    return claims.get("exp")
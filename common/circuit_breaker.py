@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Deque
+
+from common import metrics
+
+
+class CircuitState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"Circuit of {name} is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """Fails fast the calls to a backend that is failing or too slow.
+
+    The last `window` calls are kept. Once at least `min_calls` of them are there and the rate of failed or
+    slower than `slow_call_seconds` calls reaches `failure_rate`, the circuit opens and calls are rejected
+    for `open_seconds`. Then a single probe call is let through (half open): the circuit closes if it
+    succeeds and opens again otherwise.
+
+    The latencies of the successful calls also give an adaptive timeout, see `timeout`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 3,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30,
+        latency_samples: int = 100,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._timer = timer
+        self._calls: Deque[bool] = deque(maxlen=window)
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self._opened_at = 0.0
+        self._probing = False
+        self._set_state(CircuitState.CLOSED)
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and self._timer() >= self._opened_at + self.open_seconds
+        ):
+            self._set_state(CircuitState.HALF_OPEN)
+
+        return self._state
+
+    def acquire(self) -> None:
+        """Raises CircuitOpenError when the call can't be made, otherwise `release` must follow the call"""
+        state = self.state
+        if state is CircuitState.OPEN or (
+            state is CircuitState.HALF_OPEN and self._probing
+        ):
+            raise CircuitOpenError(self.name)
+
+        if state is CircuitState.HALF_OPEN:
+            self._probing = True
+
+    def release(self, success: bool, seconds: float) -> None:
+        failed = not success or seconds > self.slow_call_seconds
+        if success:
+            self._latencies.append(seconds)
+
+        if self._state is CircuitState.HALF_OPEN:
+            self._probing = False
+            if failed:
+                self._open()
+            else:
+                self._calls.clear()
+                self._set_state(CircuitState.CLOSED)
+            return
+
+        self._calls.append(failed)
+        if (
+            self._state is CircuitState.CLOSED
+            and len(self._calls) >= self.min_calls
+            and sum(self._calls) / len(self._calls) >= self.failure_rate
+        ):
+            self._open()
+
+    def cancel(self) -> None:
+        """Ends a call that was acquired without recording it, e.g. when the caller cancelled it"""
+        if self._state is CircuitState.HALF_OPEN:
+            self._probing = False
+
+    def timeout(
+        self,
+        max_seconds: float,
+        min_seconds: float = 1,
+        percentile: float = 0.99,
+        multiplier: float = 3,
+        min_samples: int = 20,
+    ) -> float:
+        """`multiplier` times the `percentile` latency of the recent successful calls, within the bounds.
+        `max_seconds` until there are enough samples."""
+        if len(self._latencies) < min_samples:
+            return max_seconds
+
+        latencies = sorted(self._latencies)
+        latency = latencies[min(int(len(latencies) * percentile), len(latencies) - 1)]
+        return max(min_seconds, min(max_seconds, latency * multiplier))
+
+    def _open(self) -> None:
+        self._opened_at = self._timer()
+        self._calls.clear()
+        self._set_state(CircuitState.OPEN)
+
+    def _set_state(self, state: CircuitState) -> None:
+        self._state = state
+        metrics.console_circuit_breaker_state(self.name, state.value)
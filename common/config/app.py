@@ -22,6 +22,49 @@ console_dot_base_url = _config(
     "CONSOLEDOT_BASE_URL", default="https://console.redhat.com"
 )
 requests_timeout = _config("TIMEOUT", default=5, cast=int)
+# Connection pool of each backend session
+requests_pool_size = _config("REQUESTS_POOL_SIZE", default=100, cast=int)
+requests_keepalive_timeout = _config("REQUESTS_KEEPALIVE_TIMEOUT", default=30, cast=int)
+requests_dns_cache_ttl = _config("REQUESTS_DNS_CACHE_TTL", default=60, cast=int)
+# Cached GET responses (opt-in per request), seconds fresh and then served while refreshed
+response_cache_size = _config("RESPONSE_CACHE_SIZE", default=1000, cast=int)
+response_cache_ttl = _config("RESPONSE_CACHE_TTL", default=300, cast=int)
+response_cache_stale_ttl = _config("RESPONSE_CACHE_STALE_TTL", default=60, cast=int)
+# Bigger responses are dropped without being read (0 to disable)
+response_max_body_size = _config(
+    "RESPONSE_MAX_BODY_SIZE", default=10 * 1024 * 1024, cast=int
+)
+# Circuit breaker of each backend: opens when the failure rate (errors or calls slower than
+# CIRCUIT_BREAKER_SLOW_CALL_SECONDS) of the last calls reaches CIRCUIT_BREAKER_FAILURE_RATE
+circuit_breaker_failure_rate = _config(
+    "CIRCUIT_BREAKER_FAILURE_RATE", default=0.5, cast=float
+)
+circuit_breaker_slow_call_seconds = _config(
+    "CIRCUIT_BREAKER_SLOW_CALL_SECONDS", default=3, cast=float
+)
+circuit_breaker_window = _config("CIRCUIT_BREAKER_WINDOW", default=20, cast=int)
+circuit_breaker_min_calls = _config("CIRCUIT_BREAKER_MIN_CALLS", default=10, cast=int)
+circuit_breaker_open_seconds = _config(
+    "CIRCUIT_BREAKER_OPEN_SECONDS", default=30, cast=float
+)
+# Timeouts derived from the observed latencies, between REQUESTS_MIN_TIMEOUT and TIMEOUT.
+# Computed for the whole backend, only for backends whose endpoints answer in similar times
+requests_adaptive_timeout = _config(
+    "REQUESTS_ADAPTIVE_TIMEOUT", default=False, cast=bool
+)
+requests_min_timeout = _config("REQUESTS_MIN_TIMEOUT", default=1, cast=float)
+# Retries of idempotent requests on transient errors, with a jittered exponential backoff
+# starting at REQUESTS_RETRY_BACKOFF seconds, as long as REQUESTS_RETRY_DEADLINE isn't reached
+requests_retries = _config("REQUESTS_RETRIES", default=2, cast=int)
+requests_retry_backoff = _config("REQUESTS_RETRY_BACKOFF", default=0.1, cast=float)
+requests_retry_max_backoff = _config(
+    "REQUESTS_RETRY_MAX_BACKOFF", default=1, cast=float
+)
+requests_retry_deadline = _config("REQUESTS_RETRY_DEADLINE", default=5, cast=float)
+
+# Slot matches built from API responses (e.g. notification events, chrome services)
+slot_match_cache_size = _config("SLOT_MATCH_CACHE_SIZE", default=64, cast=int)
+slot_match_cache_ttl = _config("SLOT_MATCH_CACHE_TTL", default=600, cast=int)
 
 app_name = _config("APP_NAME", default="astro-virtual-assistant")
 group_id = _config("GROUP_ID", default=app_name)
@@ -112,6 +155,11 @@ rhsm_url = _config("ENDPOINT__RHSM_API_PROXY__SERVICE__URL", default=__endpoint_
 actions_url = _config(
     "PRIVATE_ENDPOINT__VIRTUAL_ASSISTANT__ACTIONS__URL", default="http://localhost:5055"
 )
+# Events of the tracker sent to the actions: the ones since the last restart or session start, up to
+# this many (0 sends the whole history)
+actions_tracker_events_window = _config(
+    "ACTIONS_TRACKER_EVENTS_WINDOW", default=0, cast=int
+)
 
 tracker_store_type = _config("TRACKER_STORE_TYPE", default="InMemoryTrackerStore")
 database_host = _config("DB_HOSTNAME", default=None)
@@ -130,6 +178,13 @@ redis_username = _config("REDIS_USERNAME", default=None)
 redis_password = _config("REDIS_PASSWORD", default=None)
 
 
+def backend_config(backend: str, name: str, default, cast):
+    """Setting of a single console backend, e.g. TIMEOUT__CHROME_SERVICE overrides TIMEOUT for chrome-service"""
+    return _config(
+        f"{name}__{backend.upper().replace('-', '_')}", default=default, cast=cast
+    )
+
+
 def log_config():
     import logging
     import sys
@@ -1,4 +1,4 @@
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge
 from enum import Enum
 
 # Counters
@@ -26,6 +26,36 @@ _integration_created = Counter(
     ["integration_type"],
 )
 
+_cache_count = Counter(
+    "virtual_assistant_cache_count",
+    "Total number of lookups on in-process caches",
+    ["cache", "result"],
+)
+
+_console_request_retry_count = Counter(
+    "virtual_assistant_console_request_retry_count",
+    "Total number of console requests retried after a transient error",
+    ["backend"],
+)
+
+_console_circuit_breaker_state = Gauge(
+    "virtual_assistant_console_circuit_breaker_state",
+    "State of the circuit breaker of each console backend (0 closed, 1 half open, 2 open)",
+    ["backend"],
+)
+
+_console_request_timeout = Gauge(
+    "virtual_assistant_console_request_timeout_seconds",
+    "Adaptive timeout currently used for the requests to each console backend",
+    ["backend"],
+)
+
+_console_response_cache_count = Counter(
+    "virtual_assistant_console_response_cache_count",
+    "Total number of cached console requests by result (hit, stale, miss, not_modified)",
+    ["backend", "result"],
+)
+
 
 class Flow(Enum):
     ADVISOR = "advisor"
@@ -52,3 +82,23 @@ def flow_finished_count(flow_name: Flow, sub_flow_name: str = ""):
 
 def integration_created_count(integration_type: str):
     _integration_created.labels(integration_type=integration_type).inc()
+
+
+def cache_count(cache: str, hit: bool):
+    _cache_count.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def console_response_cache_count(backend: str, result: str):
+    _console_response_cache_count.labels(backend=backend, result=result).inc()
+
+
+def console_request_retry_count(backend: str):
+    _console_request_retry_count.labels(backend=backend).inc()
+
+
+def console_circuit_breaker_state(backend: str, state: int):
+    _console_circuit_breaker_state.labels(backend=backend).set(state)
+
+
+def console_request_timeout(backend: str, seconds: float):
+    _console_request_timeout.labels(backend=backend).set(seconds)
@@ -0,0 +1,22 @@
+from typing import Any, Dict, Text
+
+from common.rasa.tracker import window_tracker_state
+
+
+def install_tracker_events_window(max_events: int) -> None:
+    """Sends a window of the tracker events to the action server instead of the whole history.
+
+    Rasa has no setting for it, the request of its remote actions is built by RemoteAction._action_call_format.
+    """
+    from rasa.core.actions.action import RemoteAction
+
+    action_call_format = RemoteAction._action_call_format
+
+    def windowed_action_call_format(self, tracker, domain) -> Dict[Text, Any]:
+        action_call = action_call_format(self, tracker, domain)
+        action_call["tracker"] = window_tracker_state(
+            action_call["tracker"], max_events
+        )
+        return action_call
+
+    RemoteAction._action_call_format = windowed_action_call_format
@@ -1,5 +1,8 @@
+from __future__ import annotations
+
+from functools import cached_property
 from rasa_sdk import Tracker
-from typing import Text, Dict, Any, Optional
+from typing import Text, Dict, Any, List, Optional
 
 from common.identity import decode_identity
 from common.config import app
@@ -9,78 +12,216 @@ def _is_user_event(event: Dict[Text, Any]) -> bool:
     return event.get("event") == "user"
 
 
-def get_last_user_message(tracker: Tracker) -> Optional[Dict[Text, Any]]:
-    return next(filter(_is_user_event, reversed(tracker.events)), None)
+EVENTS_SUMMARY_EVENT = "events_summary"
+_RESET_EVENTS = {"restart", "session_started"}
 
 
-def get_user_identity(tracker: Tracker) -> Optional[Text]:
-    if app.is_running_locally:
-        return __get_mocked_user_identity()
+def window_tracker_state(
+    tracker_state: Dict[Text, Any], max_events: int
+) -> Dict[Text, Any]:
+    """Keeps the events since the last restart or session start, up to `max_events` of them.
 
-    latest_user_event = get_last_user_message(tracker)
+    The latest active_loop event is always kept, forms look for it. So is the latest user event, the identity
+    of the user comes from its metadata. The first event of the window is a summary of the whole history,
+    see `get_events_summary`.
+    """
+    events = tracker_state.get("events") or []
+    start = None
+    active_loop_index = None
+    user_index = None
+    for index in range(len(events) - 1, -1, -1):
+        event_type = events[index].get("event")
+        if event_type == "active_loop" and active_loop_index is None and start is None:
+            active_loop_index = index
+        elif _is_user_event(events[index]) and user_index is None:
+            user_index = index
+        elif event_type in _RESET_EVENTS and start is None:
+            start = index + 1
 
-    if latest_user_event is not None:
-        return latest_user_event.get("metadata").get("identity")
+        if start is not None and user_index is not None:
+            break
 
-    return None
+    cap_start = max(start or 0, len(events) - max_events)
+    for kept_index in (active_loop_index, user_index):
+        if kept_index is not None:
+            cap_start = min(cap_start, kept_index)
 
+    summary = {
+        "event": EVENTS_SUMMARY_EVENT,
+        "total": len(events),
+        "dropped": cap_start,
+    }
+    return {**tracker_state, "events": [summary] + events[cap_start:]}
 
-def __get_mocked_user_identity() -> Text:
-    return "eyJpZGVudGl0eSI6IHsiYWNjb3VudF9udW1iZXIiOiJhY2NvdW50MTIzIiwib3JnX2lkIjoib3JnMTIzIiwidHlwZSI6IlVzZXIiLCJ1c2VyIjp7ImlzX2ludGVybmFsIjp0cnVlLCAiaXNfb3JnX2FkbWluIjp0cnVlLCAiZW1haWwiOiJ1c2VyQHNvbWV3aGVyZSIsICJ1c2VyX2lkIjoiMTIzNDU2Nzg5MCIsInVzZXJuYW1lIjoiYXN0cm8ifSwiaW50ZXJuYWwiOnsib3JnX2lkIjoib3JnMTIzIn19fQ=="
 
+class EventsSummary:
+    """Size of the whole history of a tracker, of which the action server might only have a window"""
 
-def get_decoded_user_identity(tracker: Tracker) -> Optional[Dict[Text, Any]]:
-    identity = get_user_identity(tracker)
+    total: int
+    dropped: int
 
-    if identity is not None:
-        return decode_identity(identity)
+    def __init__(self, total: int, dropped: int):
+        self.total = total
+        self.dropped = dropped
 
-    return None
 
+def get_events_summary(tracker: Tracker) -> EventsSummary:
+    events = tracker.events
+    if events and events[0].get("event") == EVENTS_SUMMARY_EVENT:
+        return EventsSummary(events[0]["total"], events[0]["dropped"])
 
-def get_current_url(tracker: Tracker) -> Optional[Text]:
-    latest_user_event = get_last_user_message(tracker)
+    return EventsSummary(len(events), 0)
 
-    if latest_user_event is not None:
-        return latest_user_event.get("metadata").get("current_url")
 
-    return None
+class TrackerView:
+    """Finds the latest user message of a tracker once, instead of scanning the events on every lookup"""
 
+    latest_user_event_index: Optional[int]
 
-def get_is_org_admin(tracker: Tracker) -> bool:
-    latest_user_event = get_last_user_message(tracker)
+    def __init__(self, tracker: Tracker):
+        self._tracker = tracker
+        self._events_count = len(tracker.events)
+        self._identity_context: Optional[IdentityContext] = None
+        self.latest_user_event_index = next(
+            (
+                index
+                for index in range(self._events_count - 1, -1, -1)
+                if _is_user_event(tracker.events[index])
+            ),
+            None,
+        )
+
+    @property
+    def latest_user_event(self) -> Optional[Dict[Text, Any]]:
+        if self.latest_user_event_index is None:
+            return None
+        return self._tracker.events[self.latest_user_event_index]
+
+    @property
+    def metadata(self) -> Dict[Text, Any]:
+        """Metadata of the latest user message, empty if there is none"""
+        latest_user_event = self.latest_user_event
+        if latest_user_event is None:
+            return {}
+        return latest_user_event.get("metadata") or {}
+
+    @property
+    def identity_context(self) -> IdentityContext:
+        if self._identity_context is None:
+            self._identity_context = IdentityContext(self._tracker)
+        return self._identity_context
+
+    def events_since_last_user_message(self) -> List[Dict[Text, Any]]:
+        """The latest user message and the events after it, every event if there was no user message"""
+        return self._tracker.events[self.latest_user_event_index or 0 :]
+
+    def is_current(self) -> bool:
+        return len(self._tracker.events) == self._events_count
+
+
+def get_tracker_view(tracker: Tracker) -> TrackerView:
+    """Memoized on the tracker, which lives for a single action request. Rebuilt if events were added."""
+    view = getattr(tracker, "_tracker_view", None)
+    if view is None or not view.is_current():
+        view = TrackerView(tracker)
+        tracker._tracker_view = view
+
+    return view
+
+
+def get_last_user_message(tracker: Tracker) -> Optional[Dict[Text, Any]]:
+    return get_tracker_view(tracker).latest_user_event
+
+
+def get_events_since_last_user_message(tracker: Tracker) -> List[Dict[Text, Any]]:
+    return get_tracker_view(tracker).events_since_last_user_message()
+
+
+def get_user_identity(tracker: Tracker) -> Optional[Text]:
+    return get_identity_context(tracker).identity
+
+
+def _get_mocked_user_identity() -> Text:
+    return "eyJpZGVudGl0eSI6IHsiYWNjb3VudF9udW1iZXIiOiJhY2NvdW50MTIzIiwib3JnX2lkIjoib3JnMTIzIiwidHlwZSI6IlVzZXIiLCJ1c2VyIjp7ImlzX2ludGVybmFsIjp0cnVlLCAiaXNfb3JnX2FkbWluIjp0cnVlLCAiZW1haWwiOiJ1c2VyQHNvbWV3aGVyZSIsICJ1c2VyX2lkIjoiMTIzNDU2Nzg5MCIsInVzZXJuYW1lIjoiYXN0cm8ifSwiaW50ZXJuYWwiOnsib3JnX2lkIjoib3JnMTIzIn19fQ=="
+
+
+class IdentityContext:
+    """The identity of the user sending the latest message, decoded once per tracker.
+
+    The identity is only decoded when a decoded field is used, a malformed identity is still forwarded as is.
+    """
+
+    identity: Optional[Text]
+    is_org_admin: bool
+    email: Optional[Text]
+
+    def __init__(self, tracker: Tracker):
+        view = get_tracker_view(tracker)
+        metadata = view.metadata if view.latest_user_event is not None else None
+
+        if app.is_running_locally:
+            self.identity = _get_mocked_user_identity()
+        elif metadata is not None:
+            self.identity = metadata.get("identity")
+        else:
+            self.identity = None
 
-    try:
         # Default to true if running locally
-        return latest_user_event.get("metadata").get(
-            "is_org_admin", app.is_running_locally
+        self.is_org_admin = (
+            metadata.get("is_org_admin", app.is_running_locally)
+            if metadata is not None
+            else False
         )
-    except Exception as e:
-        print(f"An Exception occured while handling retrieving is_org_admin: {e}")
 
-    return False
+        self.email = metadata.get("email") if metadata is not None else None
 
+    @cached_property
+    def decoded_identity(self) -> Optional[Dict[Text, Any]]:
+        if self.identity is None:
+            return None
 
-def get_is_internal(tracker: Tracker) -> bool:
-    decoded_identity = get_decoded_user_identity(tracker)
+        return decode_identity(self.identity)
 
-    try:
-        # Default to true if running locally
-        return decoded_identity["identity"]["user"]["is_internal"]
-    except Exception as e:
-        print(f"An Exception occured while handling retrieving is_internal: {e}")
+    @cached_property
+    def org_id(self) -> Optional[Text]:
+        try:
+            return self.decoded_identity["identity"]["org_id"]
+        except (KeyError, TypeError):
+            return None
 
-    return False
+    @cached_property
+    def is_internal(self) -> bool:
+        try:
+            return self.decoded_identity["identity"]["user"]["is_internal"]
+        except Exception as e:
+            print(f"An Exception occured while handling retrieving is_internal: {e}")
 
+        return False
 
-def get_email(tracker: Tracker) -> Optional[Text]:
-    latest_user_event = get_last_user_message(tracker)
 
-    email = None
-    try:
-        email = latest_user_event.get("metadata").get("email")
-    except Exception as e:
-        print(f"An Exception occured while handling retrieving is_org_admin: {e}")
+def get_identity_context(tracker: Tracker) -> IdentityContext:
+    """Memoized with the tracker view, see `get_tracker_view`"""
+    return get_tracker_view(tracker).identity_context
+
+
+def get_decoded_user_identity(tracker: Tracker) -> Optional[Dict[Text, Any]]:
+    return get_identity_context(tracker).decoded_identity
+
+
+def get_current_url(tracker: Tracker) -> Optional[Text]:
+    return get_tracker_view(tracker).metadata.get("current_url")
+
+
+def get_is_org_admin(tracker: Tracker) -> bool:
+    return get_identity_context(tracker).is_org_admin
+
+
+def get_is_internal(tracker: Tracker) -> bool:
+    return get_identity_context(tracker).is_internal
+
+
+def get_email(tracker: Tracker) -> Optional[Text]:
+    email = get_identity_context(tracker).email
 
     if email is None or email == "":
         return "email not provided"
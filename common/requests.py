@@ -1,21 +1,617 @@
 # can I import just match and case from future python versions?
 from __future__ import annotations
 
-from typing import Any, Optional
+import asyncio
+import codecs
+import json
+import random
+import re
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import aiohttp
-from aiohttp import ContentTypeError
 from rasa_sdk import Tracker
 
-from common import logging
+from common import logging, metrics
+from common.cache import LRUCache
+from common.circuit_breaker import CircuitBreaker, CircuitOpenError
 from common.config import app
+from common.rasa.tracker import get_decoded_user_identity
+from common.singleflight import SingleFlight
 
 from .header import Header
 from .auth import get_auth_header
 
+try:
+    import orjson
+
+    # Decodes the JSON content of the responses, can be replaced by any loads taking bytes or str
+    json_loads: Callable[[Any], Any] = orjson.loads
+except ModuleNotFoundError:
+    json_loads = json.loads
+
 logger = logging.initialize_logging()
 
 
+class ConsoleBackend:
+    """A console backend: where it lives and how it is called"""
+
+    name: str
+    url: str
+    timeout: float
+    pool_size: int
+    cache_ttl: float
+    cache_stale_ttl: float
+    circuit_breaker: CircuitBreaker
+    retries: int
+    retry_backoff: float
+    retry_max_backoff: float
+    retry_deadline: float
+    max_body_size: int
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        timeout: float,
+        pool_size: int,
+        cache_ttl: float = 0,
+        cache_stale_ttl: float = 0,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        retries: int = 0,
+        retry_backoff: float = 0.1,
+        retry_max_backoff: float = 1,
+        retry_deadline: float = 5,
+        max_body_size: int = 0,
+    ):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.cache_ttl = cache_ttl
+        self.cache_stale_ttl = cache_stale_ttl
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(name)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.retry_deadline = retry_deadline
+        self.max_body_size = max_body_size
+
+    def request_timeout(self) -> float:
+        """The configured timeout, or a shorter one from the observed latencies when adaptive"""
+        if not app.requests_adaptive_timeout:
+            return self.timeout
+
+        return self.circuit_breaker.timeout(
+            self.timeout, min(app.requests_min_timeout, self.timeout)
+        )
+
+    @classmethod
+    def from_config(cls, name: str, url: str) -> ConsoleBackend:
+        """Uses the global requests settings unless overridden for the backend (e.g. TIMEOUT__RBAC)"""
+        return cls(
+            name,
+            url,
+            timeout=app.backend_config(name, "TIMEOUT", app.requests_timeout, float),
+            pool_size=app.backend_config(
+                name, "REQUESTS_POOL_SIZE", app.requests_pool_size, int
+            ),
+            cache_ttl=app.backend_config(
+                name, "RESPONSE_CACHE_TTL", app.response_cache_ttl, float
+            ),
+            cache_stale_ttl=app.backend_config(
+                name, "RESPONSE_CACHE_STALE_TTL", app.response_cache_stale_ttl, float
+            ),
+            circuit_breaker=CircuitBreaker(
+                name,
+                failure_rate=app.backend_config(
+                    name,
+                    "CIRCUIT_BREAKER_FAILURE_RATE",
+                    app.circuit_breaker_failure_rate,
+                    float,
+                ),
+                slow_call_seconds=app.backend_config(
+                    name,
+                    "CIRCUIT_BREAKER_SLOW_CALL_SECONDS",
+                    app.circuit_breaker_slow_call_seconds,
+                    float,
+                ),
+                window=app.circuit_breaker_window,
+                min_calls=app.circuit_breaker_min_calls,
+                open_seconds=app.circuit_breaker_open_seconds,
+            ),
+            retries=app.backend_config(
+                name, "REQUESTS_RETRIES", app.requests_retries, int
+            ),
+            retry_backoff=app.backend_config(
+                name, "REQUESTS_RETRY_BACKOFF", app.requests_retry_backoff, float
+            ),
+            retry_max_backoff=app.backend_config(
+                name,
+                "REQUESTS_RETRY_MAX_BACKOFF",
+                app.requests_retry_max_backoff,
+                float,
+            ),
+            retry_deadline=app.backend_config(
+                name, "REQUESTS_RETRY_DEADLINE", app.requests_retry_deadline, float
+            ),
+            max_body_size=app.backend_config(
+                name, "RESPONSE_MAX_BODY_SIZE", app.response_max_body_size, int
+            ),
+        )
+
+
+def _create_console_backends() -> Dict[str, ConsoleBackend]:
+    urls = {
+        "advisor": app.advisor_url,
+        "advisor-openshift": app.advisor_openshift_url,
+        "notifications-gw": app.notifications_gw_url,
+        "notifications": app.notifications_url,
+        "vulnerability": app.vulnerability_url,
+        "content-sources": app.content_sources_url,
+        "sources": app.sources_url,
+        "rhsm": app.rhsm_url,
+        "chrome-service": app.chrome_service_url,
+        "rbac": app.rbac_url,
+    }
+    return {name: ConsoleBackend.from_config(name, url) for name, url in urls.items()}
+
+
+# Built once, maps the app_name of the requests to its backend
+console_backends = _create_console_backends()
+
+
+def get_console_backend(app_name: str) -> ConsoleBackend:
+    backend = console_backends.get(app_name)
+    if backend is None:
+        raise ValueError(f"Invalid app_name used: {app_name}")
+
+    return backend
+
+
+class ConsoleSessions:
+    """Pooled sessions shared by the whole process, one per backend (app_name).
+
+    Sessions are created lazily in the running event loop, keep their connections alive between calls
+    and are closed by `close_console_sessions` when the action server stops.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self, backend: ConsoleBackend) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A session can't be used outside of the loop it was created on
+            self._sessions = {}
+            self._loop = loop
+
+        session = self._sessions.get(backend.name)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                # Shared by every user, cookies set for one must not be sent for the others
+                cookie_jar=aiohttp.DummyCookieJar(),
+                connector=aiohttp.TCPConnector(
+                    limit=backend.pool_size,
+                    keepalive_timeout=app.requests_keepalive_timeout,
+                    ttl_dns_cache=app.requests_dns_cache_ttl,
+                ),
+                timeout=aiohttp.ClientTimeout(total=backend.timeout),
+            )
+            self._sessions[backend.name] = session
+
+        return session
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions = {}
+        for session in sessions:
+            await session.close()
+
+
+console_sessions = ConsoleSessions()
+
+
+async def close_console_sessions() -> None:
+    await console_sessions.close()
+
+
+CACHE_SCOPE_GLOBAL = "global"
+CACHE_SCOPE_ORG = "org"
+
+_JSON_CONTENT_TYPE = re.compile(r"^application/(?:[\w.+-]+?\+)?json")
+
+# How much of the body of non OK responses is logged
+_LOGGED_BODY_SIZE = 1024
+
+
+class ConsoleResponse:
+    """What is kept of a backend response once its body is read.
+
+    Immutable and without the request (e.g. its auth headers) or the connection, so that cached and in flight
+    responses can be shared by every caller.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        headers: Mapping[str, str],
+        url: str,
+        content_type: str,
+        charset: Optional[str],
+    ):
+        self._status = status
+        self._headers = headers
+        self._url = url
+        self._content_type = content_type
+        self._charset = charset
+
+    @property
+    def status(self) -> int:
+        return self._status
+
+    @property
+    def ok(self) -> bool:
+        return self._status < 400
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        return self._headers
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    @property
+    def content_type(self) -> str:
+        return self._content_type
+
+    @property
+    def charset(self) -> Optional[str]:
+        return self._charset
+
+    @classmethod
+    def from_response(cls, response: aiohttp.ClientResponse) -> ConsoleResponse:
+        return cls(
+            response.status,
+            # Read only view of the received headers
+            response.headers,
+            str(response.url),
+            response.content_type,
+            response.charset,
+        )
+
+
+Fetch = Callable[[Dict[str, str]], Awaitable[Tuple[ConsoleResponse, bytes]]]
+
+
+class ResponseCacheEntry:
+    response: ConsoleResponse
+    body: bytes
+    etag: Optional[str]
+    fresh_until: float
+    stale_until: float
+
+    def __init__(
+        self,
+        response: ConsoleResponse,
+        body: bytes,
+        etag: Optional[str],
+        fresh_until: float,
+        stale_until: float,
+    ):
+        self.response = response
+        self.body = body
+        self.etag = etag
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """Read through cache of OK responses of GET requests.
+
+    An entry is served as is for the backend's cache_ttl. For cache_stale_ttl seconds afterwards it is still
+    served while it is refreshed in the background. Entries are revalidated with If-None-Match when the backend
+    sent an ETag.
+    """
+
+    def __init__(self, maxsize: int, timer: Callable[[], float] = time.monotonic):
+        self._entries = LRUCache(maxsize)
+        self._timer = timer
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self, key: Hashable, backend: ConsoleBackend, fetch: Fetch
+    ) -> Tuple[ConsoleResponse, bytes]:
+        entry = self._entries.get(key)
+        now = self._timer()
+
+        if entry is not None and now < entry.fresh_until:
+            metrics.console_response_cache_count(backend.name, "hit")
+            return entry.response, entry.body
+
+        if entry is not None and now < entry.stale_until:
+            metrics.console_response_cache_count(backend.name, "stale")
+            if key not in self._refreshing:
+                task = asyncio.create_task(self._refresh(key, backend, fetch, entry))
+                self._refreshing[key] = task
+                task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+            return entry.response, entry.body
+
+        metrics.console_response_cache_count(backend.name, "miss")
+        return await self._fetch(key, backend, fetch, entry)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _refresh(
+        self,
+        key: Hashable,
+        backend: ConsoleBackend,
+        fetch: Fetch,
+        entry: ResponseCacheEntry,
+    ) -> None:
+        try:
+            await self._fetch(key, backend, fetch, entry)
+        except Exception:
+            logger.warning(f"Unable to refresh cached response of {backend.name}")
+
+    async def _fetch(
+        self,
+        key: Hashable,
+        backend: ConsoleBackend,
+        fetch: Fetch,
+        entry: Optional[ResponseCacheEntry],
+    ) -> Tuple[ConsoleResponse, bytes]:
+        headers = {}
+        if entry is not None and entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+
+        response, body = await fetch(headers)
+        etag = response.headers.get("ETag")
+        if response.status == 304 and entry is not None:
+            metrics.console_response_cache_count(backend.name, "not_modified")
+            response, body = entry.response, entry.body
+            etag = etag or entry.etag
+        elif not response.ok:
+            return response, body
+
+        now = self._timer()
+        self._entries.set(
+            key,
+            ResponseCacheEntry(
+                response,
+                body,
+                etag,
+                fresh_until=now + backend.cache_ttl,
+                stale_until=now + backend.cache_ttl + backend.cache_stale_ttl,
+            ),
+        )
+        return response, body
+
+
+response_cache = ResponseCache(app.response_cache_size)
+
+
+def _response_cache_key(
+    backend: ConsoleBackend,
+    path: str,
+    params: Any,
+    cache_scope: str,
+    tracker: Tracker,
+) -> Optional[Hashable]:
+    """None when the response can't be cached, e.g. the org of an org scoped request is unknown"""
+    if cache_scope == CACHE_SCOPE_ORG:
+        try:
+            scope = "org:" + get_decoded_user_identity(tracker)["identity"]["org_id"]
+        except (KeyError, TypeError):
+            return None
+    elif cache_scope == CACHE_SCOPE_GLOBAL:
+        scope = CACHE_SCOPE_GLOBAL
+    else:
+        raise ValueError(f"Invalid cache_scope used: {cache_scope}")
+
+    return backend.name, path, _params_key(params), scope
+
+
+def _params_key(params: Any) -> Hashable:
+    if isinstance(params, dict):
+        return tuple(sorted((str(k), str(v)) for k, v in params.items()))
+    elif params is not None and not isinstance(params, str):
+        return tuple(params)
+
+    return params
+
+
+# GET requests being sent, concurrent identical requests share the same call
+in_flight_requests = SingleFlight()
+
+
+async def _fetch_console_response(
+    backend: ConsoleBackend,
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    max_timeout: Optional[float] = None,
+    **kwargs,
+) -> Tuple[ConsoleResponse, bytes]:
+    # Fails fast with CircuitOpenError while the backend is unhealthy
+    backend.circuit_breaker.acquire()
+    if "timeout" not in kwargs:
+        timeout = backend.request_timeout()
+        if max_timeout is not None:
+            timeout = min(timeout, max_timeout)
+        metrics.console_request_timeout(backend.name, timeout)
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+    logger.info("Calling console service %s %s", method.upper(), url)
+    session = console_sessions.get(backend)
+    started = time.monotonic()
+    try:
+        async with session.request(
+            method, url, headers=headers, **kwargs
+        ) as console_response:
+            body = await _read_body(backend, console_response)
+    except asyncio.CancelledError:
+        # The caller gave up (e.g. its own deadline), that says nothing about the backend
+        backend.circuit_breaker.cancel()
+        raise
+    except Exception:
+        backend.circuit_breaker.release(False, time.monotonic() - started)
+        raise
+
+    # Client errors say nothing about the health of the backend either
+    backend.circuit_breaker.release(
+        console_response.status < 500, time.monotonic() - started
+    )
+    return ConsoleResponse.from_response(console_response), body
+
+
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+_RETRYABLE_STATUSES = {502, 503, 504}
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+
+def _is_retryable(method: str, headers: Dict[str, str]) -> bool:
+    """Idempotent methods, or any method when the caller sent an idempotency key"""
+    return method.upper() in _IDEMPOTENT_METHODS or any(
+        name.lower() == IDEMPOTENCY_KEY_HEADER.lower() for name in headers
+    )
+
+
+async def _fetch_with_retries(
+    backend: ConsoleBackend,
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    **kwargs,
+) -> Tuple[ConsoleResponse, bytes]:
+    """Retries connection errors and 502, 503, 504 responses of retryable requests with full jitter backoff.
+
+    Retried requests share the backend's retry_deadline, counted from the first call: each attempt times out
+    when it is reached, and a retry only happens if its backoff ends before it.
+    """
+    retries = backend.retries if _is_retryable(method, headers) else 0
+    deadline = time.monotonic() + backend.retry_deadline
+
+    for attempt in range(retries + 1):
+        backoff = random.uniform(
+            0, min(backend.retry_max_backoff, backend.retry_backoff * 2**attempt)
+        )
+
+        def can_retry() -> bool:
+            return attempt < retries and time.monotonic() + backoff < deadline
+
+        max_timeout = None
+        if retries > 0:
+            # A zero total would disable the timeout
+            max_timeout = max(deadline - time.monotonic(), 0.001)
+
+        try:
+            response, body = await _fetch_console_response(
+                backend, method, url, headers, max_timeout, **kwargs
+            )
+            if response.status not in _RETRYABLE_STATUSES or not can_retry():
+                return response, body
+            reason = response.status
+        except aiohttp.ClientConnectionError as e:
+            if not can_retry():
+                raise
+            reason = repr(e)
+
+        logger.warning(
+            f"Retrying {method.upper()} {url} in {backoff:.2f}s after: {reason}"
+        )
+        metrics.console_request_retry_count(backend.name)
+        await asyncio.sleep(backoff)
+
+
+class ResponseTooLargeError(Exception):
+    def __init__(self, url: str, max_body_size: int):
+        super().__init__(f"Response of {url} is bigger than {max_body_size} bytes")
+
+
+async def _read_body(
+    backend: ConsoleBackend, response: aiohttp.ClientResponse
+) -> bytes:
+    """Reads the body, up to the backend's max_body_size"""
+    limit = backend.max_body_size
+    if not limit:
+        return await response.read()
+
+    if response.content_length is not None and response.content_length > limit:
+        raise ResponseTooLargeError(str(response.url), limit)
+
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        size += len(chunk)
+        if size > limit:
+            raise ResponseTooLargeError(str(response.url), limit)
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+def _encoding(response: ConsoleResponse) -> str:
+    try:
+        return codecs.lookup(response.charset or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+def _decode_content(
+    response: ConsoleResponse,
+    body: bytes,
+    fields: Optional[Sequence[str]] = None,
+) -> Any:
+    """JSON content if the response is JSON, its text otherwise.
+
+    With `fields`, only these keys are kept from the items of a JSON list (or of its "data" list). The whole
+    content is still decoded first: this trims what the callers keep around, not the peak memory.
+    """
+    encoding = _encoding(response)
+    if not _JSON_CONTENT_TYPE.match(response.content_type):
+        return body.decode(encoding)
+
+    if not body.strip():
+        return None
+
+    content = json_loads(body if encoding == "utf-8" else body.decode(encoding))
+    if fields is None:
+        return content
+
+    if isinstance(content, list):
+        return _project(content, fields)
+    if isinstance(content, dict) and isinstance(content.get("data"), list):
+        content["data"] = _project(content["data"], fields)
+
+    return content
+
+
+def _project(items: List[Any], fields: Sequence[str]) -> List[Any]:
+    return [
+        (
+            {field: item[field] for field in fields if field in item}
+            if isinstance(item, dict)
+            else item
+        )
+        for item in items
+    ]
+
+
 async def send_console_request(
     app_name: str,
     path: str,
@@ -23,74 +619,174 @@ async def send_console_request(
     method: str = "get",
     headers: Optional[Header] = None,
     fetch_content: bool = True,
+    cache_scope: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
     **kwargs,
 ) -> Any:
+    """Calls a console backend, returns its ConsoleResponse and decoded content (or only the response).
+
+    GET responses are cached when a cache_scope is given: CACHE_SCOPE_GLOBAL when the response is the same for
+    everyone (e.g. catalogs) or CACHE_SCOPE_ORG when it is the same for every user of an org.
+    Concurrent identical GET requests share a single call, each caller decodes its own copy of the content.
+    Transient errors of idempotent requests are retried, POST and PATCH only when sent with an
+    IDEMPOTENCY_KEY_HEADER.
+    `fields` limits the content of large JSON lists to the keys the caller uses, see `_decode_content`.
+    """
     if headers is None:
         headers = Header()
 
     try:
-        get_auth_header(tracker, headers)
+        await get_auth_header(tracker, headers)
     except ValueError as e:
         print(f"An Exception occured while handling retrieving auth credentials: {e}")
         return None
 
-    endpoint = None
-    if app_name == "advisor":
-        endpoint = app.advisor_url
-    elif app_name == "advisor-openshift":
-        endpoint = app.advisor_openshift_url
-    elif app_name == "notifications-gw":
-        endpoint = app.notifications_gw_url
-    elif app_name == "notifications":
-        endpoint = app.notifications_url
-    elif app_name == "vulnerability":
-        endpoint = app.vulnerability_url
-    elif app_name == "content-sources":
-        endpoint = app.content_sources_url
-    elif app_name == "sources":
-        endpoint = app.sources_url
-    elif app_name == "rhsm":
-        endpoint = app.rhsm_url
-    elif app_name == "chrome-service":
-        endpoint = app.chrome_service_url
-    elif app_name == "rbac":
-        endpoint = app.rbac_url
-    else:
-        print(f"Invalid app: {app_name}")
-        raise ValueError(f"Invalid app_name used: {app_name}")
-
-    url = "{}{}".format(endpoint, path)
+    backend = get_console_backend(app_name)
+    url = "{}{}".format(backend.url, path)
 
     try:
-        logger.info("Calling console service %s %s", method.upper(), url)
-        async with aiohttp.ClientSession() as session:
-            async with session.request(
-                method,
-                url,
-                headers=headers.build_headers(),
-                timeout=app.requests_timeout,
-                **kwargs,
-            ) as console_response:
-                if not console_response.ok:
-                    logger.error(
-                        f"Received non OK~sh response from call {method.upper()} {url}: ({console_response.status}) - {await console_response.text()}"
-                    )
-
-                if fetch_content:
-                    try:
-                        return console_response, await console_response.json()
-                    except ContentTypeError:
-                        return console_response, await console_response.text()
-
-                return console_response
+
+        cache_key = None
+        if cache_scope is not None and method.lower() == "get":
+            cache_key = _response_cache_key(
+                backend, path, kwargs.get("params"), cache_scope, tracker
+            )
+
+        async def fetch(
+            extra_headers: Dict[str, str],
+        ) -> Tuple[ConsoleResponse, bytes]:
+            def call() -> Awaitable[Tuple[ConsoleResponse, bytes]]:
+                return _fetch_with_retries(
+                    backend,
+                    method,
+                    url,
+                    {**headers.build_headers(), **extra_headers},
+                    **kwargs,
+                )
+
+            if method.lower() != "get" or not set(kwargs).issubset({"params"}):
+                return await call()
+
+            # Identical requests for the same scope: the cache scope or else the caller's own headers (identity)
+            scope = cache_key or tuple(sorted(headers.build_headers().items()))
+            return await in_flight_requests.do(
+                (
+                    backend.name,
+                    url,
+                    _params_key(kwargs.get("params")),
+                    scope,
+                    tuple(sorted(extra_headers.items())),
+                ),
+                call,
+            )
+
+        if cache_key is not None:
+            console_response, body = await response_cache.get(cache_key, backend, fetch)
+        else:
+            console_response, body = await fetch({})
+
+        if not console_response.ok:
+            logged_body = body[:_LOGGED_BODY_SIZE].decode(
+                _encoding(console_response), errors="replace"
+            )
+            logger.error(
+                f"Received non OK~sh response from call {method.upper()} {url}: ({console_response.status}) - {logged_body}"
+            )
+
+        if fetch_content:
+            return console_response, _decode_content(console_response, body, fields)
+
+        return console_response
+    except CircuitOpenError:
+        logger.warning(
+            f"Not calling {method.upper()} {url}: {backend.name} is failing, its circuit is open"
+        )
+        return _failed_result(fetch_content)
     except Exception as e:
         logger.error(
             f"Exception while handling request: {method.upper()} {url}", exc_info=True
         )
-        bad_response = object()
-        bad_response.ok = False
-        bad_response.status = None
+        return _failed_result(fetch_content)
 
-        if fetch_content:
-            return bad_response, None
-        return bad_response
+
+class FailedResponse:
+    """Stands for the response of a request that couldn't be sent or didn't complete"""
+
+    ok = False
+    status = None
+
+
+def _failed_result(fetch_content: bool) -> Any:
+    if fetch_content:
+        return FailedResponse(), None
+    return FailedResponse()
+
+
+class ConsoleRequest:
+    """A request for `gather_console_requests`, takes the arguments of `send_console_request`"""
+
+    def __init__(self, app_name: str, path: str, method: str = "get", **kwargs):
+        self.app_name = app_name
+        self.path = path
+        self.method = method
+        self.kwargs = kwargs
+
+    @property
+    def fetch_content(self) -> bool:
+        return self.kwargs.get("fetch_content", True)
+
+
+async def gather_console_requests(
+    tracker: Tracker,
+    *requests: ConsoleRequest,
+    timeout: Optional[float] = None,
+) -> List[Any]:
+    """Sends the requests concurrently and returns their results in the same order.
+
+    A request that fails, or isn't done when the shared timeout expires, gets a FailedResponse
+    without affecting the others.
+    """
+    if not requests:
+        return []
+
+    tasks = [
+        asyncio.ensure_future(
+            send_console_request(
+                request.app_name,
+                request.path,
+                tracker,
+                request.method,
+                **request.kwargs,
+            )
+        )
+        for request in requests
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for request, task in zip(requests, tasks):
+        result = None
+        if task in pending:
+            logger.error(
+                f"Timed out waiting for {request.method.upper()} {request.app_name} {request.path}"
+            )
+        elif task.cancelled():
+            logger.error(
+                f"Cancelled request: {request.method.upper()} {request.app_name} {request.path}"
+            )
+        elif task.exception() is not None:
+            logger.error(
+                f"Exception while handling request: {request.method.upper()} {request.app_name} {request.path}",
+                exc_info=task.exception(),
+            )
+        else:
+            result = task.result()
+
+        results.append(
+            result if result is not None else _failed_result(request.fetch_content)
+        )
+
+    return results
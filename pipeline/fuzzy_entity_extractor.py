@@ -1,9 +1,9 @@
 from __future__ import annotations
 import logging
-from itertools import chain
-from typing import Any, Dict, List, Optional, Text, Type
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Text, Tuple, Type
 
-import jsonpickle
 from rasa.nlu.extractors.extractor import EntityExtractorMixin
 from rasa.nlu.tokenizers.tokenizer import Tokenizer
 
@@ -23,51 +23,228 @@ from rasa.shared.nlu.constants import (
     ENTITY_ATTRIBUTE_START,
     ENTITY_ATTRIBUTE_VALUE,
     ENTITY_ATTRIBUTE_END,
-    ENTITY_ATTRIBUTE_CONFIDENCE,
 )
 from rasa.shared.nlu.training_data.training_data import TrainingData
 from rasa.shared.nlu.training_data.message import Message
 
+import numpy as np
 from rapidfuzz import process, fuzz
 
+from common.cache import LRUCache
 from pipeline.allow_disable import allow_disable
 
 logger = logging.getLogger(__name__)
 
-FUZZY_ENTITIES_FILENAME = "fuzzy_entities.pkl"
+# The fuzzy entities are stored as plain numpy arrays (no pickles) so they can be loaded
+# without reconstructing python objects, memory mapped and inspected with `numpy.load`.
+FUZZY_ENTITIES_FORMAT_VERSION = 1
+FUZZY_ENTITIES_METADATA_FILENAME = "fuzzy_entities.json"
+FUZZY_ENTITIES_ARRAY_FILENAME = "fuzzy_entities.{}.npy"
+# Names of the entities
+FUZZY_ENTITIES_ARRAY_NAMES = "names"
+# Candidates of the entity i are candidates[offsets[i]:offsets[i + 1]]
+FUZZY_ENTITIES_ARRAY_OFFSETS = "offsets"
+# Every value and synonym of all the entities
+FUZZY_ENTITIES_ARRAY_CANDIDATES = "candidates"
+# Value resolved by each of the candidates
+FUZZY_ENTITIES_ARRAY_VALUES = "values"
 
 CONFIG_SENTENCE_SCORE_CUTOFF = "sentence_score_cutoff"
 CONFIG_WORD_SCORE_CUTOFF = "word_score_cutoff"
 CONFIG_CASE_SENSITIVE = "case_sensitive"
 CONFIG_USE_SLOTS = "use_slots"
-
-OVERRIDE_LEFT = -1
-OVERRIDE_RIGHT = 1
+CONFIG_VECTORIZED = "vectorized"
+CONFIG_WORKERS = "workers"
+CONFIG_CACHE_SIZE = "cache_size"
+CONFIG_CACHE_TTL = "cache_ttl"
+CONFIG_PREFILTER = "prefilter"
+CONFIG_BATCH_SIZE = "batch_size"
 
 
 class FuzzyEntities:
+    """Values and synonyms of an entity.
+
+    All the candidates (the values first and then the synonyms) are kept in a single list,
+    with a parallel array holding the index of the value each candidate resolves to. The
+    extraction works with candidate ids and only resolves the values at the end.
+    """
+
+    __slots__ = ("name", "candidates", "values", "value_ids")
+
     name: Text
-    entity_list: List[Text]
-    value_mapping: Dict[Text, Text]
+    candidates: List[Text]
+    values: List[Text]
+    value_ids: np.ndarray
 
     def __init__(self, name: Text, entity_list: List[Text], synonyms: Dict[Text, Text]):
+        known_values = set(entity_list)
+        candidates = entity_list.copy()
+        candidates.extend(
+            [synonym for synonym, entity in synonyms.items() if entity in known_values]
+        )
+
+        self._set(
+            name,
+            candidates,
+            [synonyms.get(candidate, candidate) for candidate in candidates],
+        )
+
+    @classmethod
+    def from_values(
+        cls, name: Text, candidates: List[Text], values: List[Text]
+    ) -> FuzzyEntities:
+        """Builds the entities from its candidates (values and synonyms) and the value each
+        of them resolves to"""
+        fuzzy_entities = cls.__new__(cls)
+        fuzzy_entities._set(name, list(candidates), values)
+        return fuzzy_entities
+
+    def _set(self, name: Text, candidates: List[Text], values: List[Text]) -> None:
+        value_ids: Dict[Text, int] = {}
+        for value in values:
+            value_ids.setdefault(value, len(value_ids))
+
         self.name = name
-        self.entity_list = entity_list.copy()
-        self.entity_list.extend(
-            [synonym for synonym, entity in synonyms.items() if entity in entity_list]
+        self.candidates = candidates
+        self.values = list(value_ids.keys())
+        self.value_ids = np.fromiter(
+            (value_ids[value] for value in values), dtype=np.int32, count=len(values)
         )
 
-        self.value_mapping = {
-            entity: synonyms[entity]
-            for entity in self.entity_list
-            if entity in synonyms
+    def value_of(self, candidate_id: int) -> Text:
+        return self.values[self.value_ids[candidate_id]]
+
+
+class FuzzyEntitiesIndex:
+    """Precompiled view of a FuzzyEntities used at inference time.
+
+    Candidates are grouped by their token count, so a message only needs to be windowed
+    once per distinct token count, no matter how many entity types share it.
+    """
+
+    entities: FuzzyEntities
+    token_counts: List[int]
+    candidates_by_token_count: Dict[int, List[Text]]
+    candidate_ids_by_token_count: Dict[int, np.ndarray]
+
+    def __init__(self, entities: FuzzyEntities):
+        self.entities = entities
+        self.token_counts = [
+            len(candidate.split(" ")) for candidate in entities.candidates
+        ]
+
+        seen = set()
+        candidates_by_token_count: Dict[int, List[Text]] = {}
+        candidate_ids_by_token_count: Dict[int, List[int]] = {}
+        for candidate_id, candidate in enumerate(entities.candidates):
+            if candidate in seen:
+                continue
+
+            seen.add(candidate)
+            token_count = self.token_counts[candidate_id]
+            candidates_by_token_count.setdefault(token_count, []).append(candidate)
+            candidate_ids_by_token_count.setdefault(token_count, []).append(
+                candidate_id
+            )
+
+        self.candidates_by_token_count = candidates_by_token_count
+        self.candidate_ids_by_token_count = {
+            token_count: np.array(candidate_ids, dtype=np.int32)
+            for token_count, candidate_ids in candidate_ids_by_token_count.items()
+        }
+
+    @property
+    def name(self) -> Text:
+        return self.entities.name
+
+
+class NgramPrefilter:
+    """Character bigram index telling which entity types could match a message.
+
+    Candidates and messages are padded with a space, so the first and last characters get
+    their own bigrams. Two strings that don't share any padded bigram can't get a QRatio
+    of MIN_SCORE_CUTOFF or more (the bound is 2L/(3L+1) for a string of length L), so with
+    a word score cutoff of at least MIN_SCORE_CUTOFF an entity type without any bigram in
+    common with the message can be skipped without changing the results.
+    """
+
+    NGRAM_SIZE = 2
+    MIN_SCORE_CUTOFF = 200 / 3
+
+    _entity_types_by_ngram: Dict[Text, int]
+
+    def __init__(self, indexes: List[FuzzyEntitiesIndex]):
+        self._entity_types_by_ngram = {}
+        for position, index in enumerate(indexes):
+            bit = 1 << position
+            for candidate in index.candidates_by_token_count.values():
+                for ngram in self._ngrams_of_all(candidate):
+                    self._entity_types_by_ngram[ngram] = (
+                        self._entity_types_by_ngram.get(ngram, 0) | bit
+                    )
+
+    def plausible_entity_types(self, text: Text) -> int:
+        """Returns a bitmask with the positions of the entity types sharing at least one
+        ngram with the text."""
+        entity_types = 0
+        for ngram in self._ngrams(text):
+            entity_types |= self._entity_types_by_ngram.get(ngram, 0)
+
+        return entity_types
+
+    @classmethod
+    def _ngrams_of_all(cls, texts: List[Text]) -> set:
+        ngrams = set()
+        for text in texts:
+            ngrams.update(cls._ngrams(text))
+
+        return ngrams
+
+    @classmethod
+    def _ngrams(cls, text: Text) -> set:
+        padded = f" {text} "
+        return {
+            padded[i : i + cls.NGRAM_SIZE]
+            for i in range(len(padded) - cls.NGRAM_SIZE + 1)
         }
 
-    def get_value_of(self, entity: Text) -> Text:
-        if entity in self.value_mapping:
-            return self.value_mapping[entity]
 
-        return entity
+class MessageWindows:
+    """Token windows of a message, computed lazily and shared by all entity types.
+
+    Each window is a tuple of (start, end, processed text).
+    """
+
+    text: Text
+    plausible_entity_types: int
+
+    def __init__(
+        self,
+        text: Text,
+        tokens: List[Any],
+        processed_tokens: List[Text],
+        plausible_entity_types: int = -1,
+    ):
+        self.text = text
+        self.plausible_entity_types = plausible_entity_types
+        self._tokens = tokens
+        self._processed_tokens = processed_tokens
+        self._windows: Dict[int, List[Tuple[int, int, Text]]] = {}
+
+    def get(self, token_count: int) -> List[Tuple[int, int, Text]]:
+        windows = self._windows.get(token_count)
+        if windows is None:
+            windows = [
+                (
+                    self._tokens[i].start,
+                    self._tokens[i + token_count - 1].end,
+                    " ".join(self._processed_tokens[i : i + token_count]),
+                )
+                for i in range(len(self._tokens) - token_count + 1)
+            ]
+            self._windows[token_count] = windows
+
+        return windows
 
 
 @DefaultV1Recipe.register(
@@ -78,10 +255,16 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
     """Adds message features based on look up tables using fuzzy matching"""
 
     fuzzy_entities: List[FuzzyEntities]
+    fuzzy_entities_index: List[FuzzyEntitiesIndex]
+    prefilter: Optional[NgramPrefilter]
     sentence_score_cutoff: float
     word_score_cutoff: float
     case_sensitive: bool
     use_slots: bool
+    vectorized: bool
+    workers: int
+    batch_size: int
+    cache: Optional[LRUCache]
 
     @classmethod
     def required_components(cls) -> List[Type]:
@@ -100,6 +283,23 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
             CONFIG_CASE_SENSITIVE: False,
             # Use slots
             CONFIG_USE_SLOTS: False,
+            # Score all the token windows against all the values of an entity in a single
+            # `process.cdist` call instead of one `fuzz.QRatio` call per window
+            CONFIG_VECTORIZED: False,
+            # Threads used by `process.cdist` when vectorized, -1 uses all the cores
+            CONFIG_WORKERS: -1,
+            # Number of processed messages whose entities are kept in memory, 0 disables
+            # the cache. Useful for repeated short messages (e.g. button titles)
+            CONFIG_CACHE_SIZE: 0,
+            # Seconds a cached result is kept, None keeps it until evicted
+            CONFIG_CACHE_TTL: None,
+            # Skip the entity types that don't share any character bigram with the message.
+            # Doesn't change the results, so it is ignored when the word score cutoff is
+            # below NgramPrefilter.MIN_SCORE_CUTOFF (66.7)
+            CONFIG_PREFILTER: True,
+            # Max number of messages scored together when `process` gets more than one
+            # message (e.g. `rasa test nlu`). Bounds the size of the score matrices
+            CONFIG_BATCH_SIZE: 128,
         }
 
     def __init__(
@@ -119,6 +319,18 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
         self.word_score_cutoff = self._config[CONFIG_WORD_SCORE_CUTOFF]
         self.case_sensitive = self._config[CONFIG_CASE_SENSITIVE]
         self.use_slots = self._config[CONFIG_USE_SLOTS]
+        self.vectorized = self._config[CONFIG_VECTORIZED]
+        self.workers = self._config[CONFIG_WORKERS]
+        self.batch_size = self._config[CONFIG_BATCH_SIZE]
+        self.cache = (
+            LRUCache(
+                self._config[CONFIG_CACHE_SIZE],
+                ttl=self._config[CONFIG_CACHE_TTL],
+            )
+            if self._config[CONFIG_CACHE_SIZE] > 0
+            else None
+        )
+        self._compile()
 
     @classmethod
     def create(
@@ -134,27 +346,91 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
     def train(self, training_data: TrainingData, domain: Domain) -> Resource:
         """Train the component with all know look up tables"""
         self.fuzzy_entities = self._get_entities(training_data, domain)
+        self._compile()
         self._persist()
         return self._resource
 
     def process(self, messages: List[Message]) -> List[Message]:
         """Extract entities from messages and appends them to the attribute
 
+        When there is more than one message, the messages are scored together in batches.
+
         Returns:
           the given list of messages that have been modified in-place
         """
-        for message in messages:
-            self.process_message(message)
+        if len(messages) == 1:
+            self.process_message(messages[0])
+            return messages
+
+        extracted_entities: List[Optional[List[Dict[Text, Any]]]] = []
+        pending = []
+        for position, message in enumerate(messages):
+            entities = self._get_cached(message)
+            extracted_entities.append(entities)
+            if entities is None:
+                pending.append(position)
+
+        batch_size = max(self.batch_size, 1)
+        for batch_start in range(0, len(pending), batch_size):
+            batch = pending[batch_start : batch_start + batch_size]
+            batch_entities = self._extract_entities_batch(
+                [messages[position] for position in batch]
+            )
+            for position, entities in zip(batch, batch_entities):
+                self._set_cached(messages[position], entities)
+                extracted_entities[position] = [dict(entity) for entity in entities]
+
+        for message, entities in zip(messages, extracted_entities):
+            self._add_entities(message, entities)
 
         return messages
 
     def process_message(self, message: Message) -> None:
-        extracted_entities = self.extract_entities(message)
-        self.add_extractor_name(extracted_entities)
-        message.set(
-            ENTITIES, message.get(ENTITIES, []) + extracted_entities, add_to_output=True
+        entities = self._get_cached(message)
+        if entities is None:
+            entities = self.extract_entities(message)
+            self._set_cached(message, entities)
+            entities = [dict(entity) for entity in entities]
+
+        self._add_entities(message, entities)
+
+    def _add_entities(self, message: Message, entities: List[Dict[Text, Any]]) -> None:
+        self.add_extractor_name(entities)
+        message.set(ENTITIES, message.get(ENTITIES, []) + entities, add_to_output=True)
+
+    def _cache_key(self, message: Message) -> Optional[Tuple]:
+        """The processed text plus the token spans, as that is all the extraction depends on"""
+        if self.cache is None or not message.get(TEXT):
+            return None
+
+        return (
+            self._process_text(message.get(TEXT)),
+            tuple(
+                (token.start, token.end)
+                for token in message.get(TOKENS_NAMES[TEXT], [])
+            ),
         )
 
+    def _get_cached(self, message: Message) -> Optional[List[Dict[Text, Any]]]:
+        """Copy of the cached entities of the message, if any.
+
+        Entities are mutated later on (e.g. add_extractor_name), so copies are handed out.
+        """
+        key = self._cache_key(message)
+        if key is None:
+            return None
+
+        entities = self.cache.get(key)
+        if entities is None:
+            return None
+
+        return [dict(entity) for entity in entities]
+
+    def _set_cached(self, message: Message, entities: List[Dict[Text, Any]]) -> None:
+        key = self._cache_key(message)
+        if key is not None:
+            self.cache.set(key, entities)
+
     def extract_entities(self, message: Message) -> List[Dict[Text, Any]]:
         """Process the message to find entities.
         The algorithm tries to find the matches from entities using fuzzy search
@@ -162,56 +438,196 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
         The first goal is to use only one word and we might eventually add other heuristics
         to support multiple words.
         """
+        windows = self._message_windows(message)
+        if windows is None:
+            return []
+
+        score_windows = (
+            self._score_windows_vectorized if self.vectorized else self._score_windows
+        )
+
+        entities: List[Dict[Text, Any]] = []
+        for position, index in enumerate(self.fuzzy_entities_index):
+            if windows.plausible_entity_types & (1 << position):
+                entities.extend(
+                    self._build_entities(index, score_windows(index, windows))
+                )
+
+        return entities
+
+    def _extract_entities_batch(
+        self, messages: List[Message]
+    ) -> List[List[Dict[Text, Any]]]:
+        """Same as `extract_entities` for many messages at once. The windows of all the
+        messages are scored together with a single `process.cdist` call per entity type
+        and token count, and then the hits are scattered back to their messages."""
+        entities: List[List[Dict[Text, Any]]] = [[] for _ in messages]
+        windows_list = []
+        positions = []
+        for position, message in enumerate(messages):
+            windows = self._message_windows(message)
+            if windows is not None:
+                windows_list.append(windows)
+                positions.append(position)
+
+        for entity_type, index in enumerate(self.fuzzy_entities_index):
+            batch = [
+                (position, windows)
+                for position, windows in zip(positions, windows_list)
+                if windows.plausible_entity_types & (1 << entity_type)
+            ]
+            if not batch:
+                continue
 
-        entities: Dict[Text, List[Dict[Text, Any]]] = {}
+            hits_list = self._score_windows_batch(
+                index, [windows for _, windows in batch]
+            )
+            for (position, _), hits in zip(batch, hits_list):
+                entities[position].extend(self._build_entities(index, hits))
+
+        return entities
 
+    def _message_windows(self, message: Message) -> Optional[MessageWindows]:
         tokens = None
-        if self.fuzzy_entities and message.get(TEXT):
+        if self.fuzzy_entities_index and message.get(TEXT):
             tokens = message.get(TOKENS_NAMES[TEXT], [])
 
         if not tokens:
-            return []
+            return None
+
+        processed_tokens = [self._process_text(token.text) for token in tokens]
+        return MessageWindows(
+            self._process_text(message.get(TEXT)),
+            tokens,
+            processed_tokens,
+            (
+                self.prefilter.plausible_entity_types(" ".join(processed_tokens))
+                if self.prefilter is not None
+                else -1
+            ),
+        )
+
+    def _build_entities(
+        self, index: FuzzyEntitiesIndex, hits: List[Tuple[int, int, int, float]]
+    ) -> List[Dict[Text, Any]]:
+        return [
+            {
+                ENTITY_ATTRIBUTE_TYPE: index.name,
+                ENTITY_ATTRIBUTE_START: start,
+                ENTITY_ATTRIBUTE_END: end,
+                ENTITY_ATTRIBUTE_VALUE: index.entities.value_of(candidate_id),
+            }
+            for start, end, candidate_id, _ in self._reconciliate_entities(hits)
+        ]
+
+    def _score_windows(
+        self, index: FuzzyEntitiesIndex, windows: MessageWindows
+    ) -> List[Tuple[int, int, int, float]]:
+        """Finds the candidates of the sentence and scores them against every window with
+        the same token count.
+
+        Returns a list of (start, end, candidate id, score) for every window above the
+        word score cutoff.
+        """
+        hits = []
+        fuzzy_result_list = process.extract(
+            windows.text,
+            index.entities.candidates,
+            score_cutoff=self.sentence_score_cutoff,
+            limit=None,
+        )
+
+        for candidate, _, candidate_id in fuzzy_result_list:
+            for start, end, window in windows.get(index.token_counts[candidate_id]):
+                ratio = fuzz.QRatio(window, candidate)
+                if ratio >= self.word_score_cutoff:
+                    hits.append((start, end, candidate_id, ratio))
 
-        for fuzzy_entity in self.fuzzy_entities:
-            fuzzy_result_list = process.extract(
-                self._process_text(message.get(TEXT)),
-                fuzzy_entity.entity_list,
-                score_cutoff=self.sentence_score_cutoff,
-                limit=None,
+        return hits
+
+    def _score_windows_vectorized(
+        self, index: FuzzyEntitiesIndex, windows: MessageWindows
+    ) -> List[Tuple[int, int, int, float]]:
+        """Same as `_score_windows` but scores every token count group with a single
+        `process.cdist` call and thresholds the resulting score matrix.
+        """
+        return self._score_windows_batch(index, [windows])[0]
+
+    def _score_windows_batch(
+        self, index: FuzzyEntitiesIndex, windows_list: List[MessageWindows]
+    ) -> List[List[Tuple[int, int, int, float]]]:
+        """Scores the windows of many messages against an entity type, one `process.cdist`
+        call per token count group for the sentence cutoff and another one for the word
+        cutoff. Returns the hits of every message.
+        """
+        hits: List[List[Tuple[int, int, int, float]]] = [[] for _ in windows_list]
+        for token_count, candidates in index.candidates_by_token_count.items():
+            messages = [
+                i for i, windows in enumerate(windows_list) if windows.get(token_count)
+            ]
+            if not messages:
+                continue
+
+            sentence_matches = (
+                process.cdist(
+                    [windows_list[i].text for i in messages],
+                    candidates,
+                    scorer=fuzz.WRatio,
+                    score_cutoff=self.sentence_score_cutoff,
+                    dtype=np.float64,
+                    workers=self.workers,
+                )
+                >= self.sentence_score_cutoff
+            )
+            columns = np.flatnonzero(sentence_matches.any(axis=0))
+            if columns.size == 0:
+                continue
+
+            group_windows = []
+            owners = []
+            for row, i in enumerate(messages):
+                message_windows = windows_list[i].get(token_count)
+                group_windows.extend(message_windows)
+                owners.extend([row] * len(message_windows))
+
+            scores = process.cdist(
+                [window for _, _, window in group_windows],
+                [candidates[column] for column in columns],
+                scorer=fuzz.QRatio,
+                score_cutoff=self.word_score_cutoff,
+                dtype=np.float64,
+                workers=self.workers,
             )
+            # A window only matches the candidates found in the sentence of its message
+            matches = (scores >= self.word_score_cutoff) & sentence_matches[
+                np.asarray(owners)
+            ][:, columns]
+            candidate_ids = index.candidate_ids_by_token_count[token_count][columns]
+
+            for window_id, column in zip(*np.nonzero(matches)):
+                start, end, _ = group_windows[window_id]
+                hits[messages[owners[window_id]]].append(
+                    (
+                        start,
+                        end,
+                        int(candidate_ids[column]),
+                        float(scores[window_id, column]),
+                    )
+                )
 
-            if len(fuzzy_result_list) > 0:
-                for fuzzy_result in fuzzy_result_list:
-                    token_count = len(fuzzy_result[0].split(" "))
-
-                    for i in range(len(tokens) - token_count + 1):
-                        sub_message = " ".join(
-                            map(lambda t: t.text, tokens[i : i + token_count])
-                        )
-                        ratio = fuzz.QRatio(
-                            self._process_text(sub_message), fuzzy_result[0]
-                        )
-                        if ratio >= self.word_score_cutoff:
-                            if fuzzy_entity.name not in entities:
-                                entities[fuzzy_entity.name] = []
-
-                            entities[fuzzy_entity.name].append(
-                                {
-                                    ENTITY_ATTRIBUTE_TYPE: fuzzy_entity.name,
-                                    ENTITY_ATTRIBUTE_START: tokens[i].start,
-                                    ENTITY_ATTRIBUTE_END: tokens[
-                                        i + token_count - 1
-                                    ].end,
-                                    ENTITY_ATTRIBUTE_VALUE: fuzzy_entity.get_value_of(
-                                        fuzzy_result[0]
-                                    ),
-                                    ENTITY_ATTRIBUTE_CONFIDENCE: ratio,
-                                }
-                            )
-
-        entities = self._reconciliate_entities(entities)
-
-        return list(chain.from_iterable(entities.values()))
+        return hits
+
+    def _compile(self) -> None:
+        """Builds the inference structures out of the fuzzy entities"""
+        self.fuzzy_entities_index = [
+            FuzzyEntitiesIndex(entities) for entities in self.fuzzy_entities
+        ]
+        self.prefilter = (
+            NgramPrefilter(self.fuzzy_entities_index)
+            if self._config[CONFIG_PREFILTER]
+            and self.word_score_cutoff >= NgramPrefilter.MIN_SCORE_CUTOFF
+            else None
+        )
 
     def _process_text(self, text: Text):
         if self.case_sensitive:
@@ -220,51 +636,50 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
         return text.lower()
 
     @staticmethod
-    def _reconciliate_entities(entities: Dict):
-        rencociliated_entities = {}
-        for entity_type, elements in entities.items():
-            elements = sorted(elements, key=lambda e: e[ENTITY_ATTRIBUTE_START])
-
-            for i in range(len(elements) - 1):
-                left = elements[i]
-                right = elements[i + 1]
-                override = None
-
-                if right[ENTITY_ATTRIBUTE_START] == left[ENTITY_ATTRIBUTE_START]:
-                    if right[ENTITY_ATTRIBUTE_END] == left[ENTITY_ATTRIBUTE_END]:
-                        continue
-                    elif right[ENTITY_ATTRIBUTE_END] > left[ENTITY_ATTRIBUTE_END]:
-                        override = OVERRIDE_RIGHT
-                    else:
-                        override = OVERRIDE_LEFT
-                elif left[ENTITY_ATTRIBUTE_END] < right[ENTITY_ATTRIBUTE_START]:
-                    continue
-                else:
-                    rightScore = (
-                        right[ENTITY_ATTRIBUTE_END] - right[ENTITY_ATTRIBUTE_START]
-                    ) * right[ENTITY_ATTRIBUTE_CONFIDENCE]
-                    leftScore = (
-                        left[ENTITY_ATTRIBUTE_END] - left[ENTITY_ATTRIBUTE_START]
-                    ) * left[ENTITY_ATTRIBUTE_CONFIDENCE]
-                    if rightScore > leftScore:
-                        override = OVERRIDE_RIGHT
-                    elif leftScore > rightScore:
-                        override = OVERRIDE_LEFT
-
-                if override is OVERRIDE_RIGHT:
-                    elements[i] = right
-                elif override is OVERRIDE_LEFT:
-                    elements[i + 1] = left
-
-            reconciliation_map = {}
-            for element in elements:
-                element.pop(ENTITY_ATTRIBUTE_CONFIDENCE, None)
-                reconciliation_map[
-                    f"{element[ENTITY_ATTRIBUTE_VALUE]}-{element[ENTITY_ATTRIBUTE_START]}x{element[ENTITY_ATTRIBUTE_END]}"
-                ] = element
-            rencociliated_entities[entity_type] = reconciliation_map.values()
-
-        return rencociliated_entities
+    def _reconciliate_entities(
+        hits: List[Tuple[int, int, int, float]],
+    ) -> List[Tuple[int, int, int, float]]:
+        """Resolves the overlapping hits of an entity type.
+
+        Keeps the best scored hit of every span and then picks the set of non-overlapping
+        spans with the highest total weight (span length times score), using weighted
+        interval scheduling. Returns the hits sorted by their position.
+        """
+        best_by_span: Dict[Tuple[int, int], Tuple[int, int, int, float]] = {}
+        for hit in hits:
+            span = (hit[0], hit[1])
+            current = best_by_span.get(span)
+            if current is None or (hit[3], -hit[2]) > (current[3], -current[2]):
+                best_by_span[span] = hit
+
+        # Sorted by end, so the spans compatible with the i-th one are a prefix
+        spans = sorted(best_by_span.values(), key=lambda h: (h[1], h[0]))
+        ends = [end for _, end, _, _ in spans]
+
+        # best_weight[i] is the best total weight using only the first i spans
+        best_weight = [0.0] * (len(spans) + 1)
+        previous = [0] * (len(spans) + 1)
+        taken = [False] * (len(spans) + 1)
+        for i, (start, end, _, score) in enumerate(spans, start=1):
+            previous[i] = bisect_right(ends, start, 0, i - 1)
+            weight = best_weight[previous[i]] + (end - start) * score
+            if weight > best_weight[i - 1]:
+                best_weight[i] = weight
+                taken[i] = True
+            else:
+                best_weight[i] = best_weight[i - 1]
+
+        reconciliated = []
+        i = len(spans)
+        while i > 0:
+            if taken[i]:
+                reconciliated.append(spans[i - 1])
+                i = previous[i]
+            else:
+                i -= 1
+
+        reconciliated.reverse()
+        return reconciliated
 
     @classmethod
     def load(
@@ -280,10 +695,7 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
 
         try:
             with model_storage.read_from(resource) as model_dir:
-                fuzzy_entities_file = model_dir / FUZZY_ENTITIES_FILENAME
-                fuzzy_entities = jsonpickle.decode(
-                    rasa.shared.utils.io.read_json_file(fuzzy_entities_file)
-                )
+                fuzzy_entities = cls._read_fuzzy_entities(model_dir)
         except (ValueError, FileNotFoundError):
             logger.warning(
                 f"Failed to load `{cls.__class__.__name__}` from model storage. "
@@ -299,12 +711,72 @@ class FuzzyEntityExtractor(EntityExtractorMixin, GraphComponent):
 
     def _persist(self) -> None:
         with self._model_storage.write_to(self._resource) as model_dir:
-            fuzzy_entities_file = model_dir / FUZZY_ENTITIES_FILENAME
+            self._write_fuzzy_entities(model_dir, self.fuzzy_entities)
+
+    @staticmethod
+    def _write_fuzzy_entities(
+        model_dir: Path, fuzzy_entities: List[FuzzyEntities]
+    ) -> None:
+        offsets = [0]
+        candidates = []
+        values = []
+        for entities in fuzzy_entities:
+            candidates.extend(entities.candidates)
+            values.extend(map(entities.value_of, range(len(entities.candidates))))
+            offsets.append(len(candidates))
+
+        arrays = {
+            FUZZY_ENTITIES_ARRAY_NAMES: np.array(
+                [entities.name for entities in fuzzy_entities], dtype=np.str_
+            ),
+            FUZZY_ENTITIES_ARRAY_OFFSETS: np.array(offsets, dtype=np.int64),
+            FUZZY_ENTITIES_ARRAY_CANDIDATES: np.array(candidates, dtype=np.str_),
+            FUZZY_ENTITIES_ARRAY_VALUES: np.array(values, dtype=np.str_),
+        }
+
+        for key, array in arrays.items():
+            np.save(
+                model_dir / FUZZY_ENTITIES_ARRAY_FILENAME.format(key),
+                array,
+                allow_pickle=False,
+            )
+
+        rasa.shared.utils.io.dump_obj_as_json_to_file(
+            model_dir / FUZZY_ENTITIES_METADATA_FILENAME,
+            {"version": FUZZY_ENTITIES_FORMAT_VERSION, "arrays": list(arrays.keys())},
+        )
+
+    @staticmethod
+    def _read_fuzzy_entities(model_dir: Path) -> List[FuzzyEntities]:
+        metadata = rasa.shared.utils.io.read_json_file(
+            model_dir / FUZZY_ENTITIES_METADATA_FILENAME
+        )
+        if metadata.get("version") != FUZZY_ENTITIES_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported fuzzy entities format version {metadata.get('version')}, "
+                f"expected {FUZZY_ENTITIES_FORMAT_VERSION}. Retrain the model."
+            )
+
+        def read_array(key: Text) -> np.ndarray:
+            return np.load(
+                model_dir / FUZZY_ENTITIES_ARRAY_FILENAME.format(key),
+                mmap_mode="r",
+                allow_pickle=False,
+            )
+
+        names = read_array(FUZZY_ENTITIES_ARRAY_NAMES).tolist()
+        offsets = read_array(FUZZY_ENTITIES_ARRAY_OFFSETS).tolist()
+        candidates = read_array(FUZZY_ENTITIES_ARRAY_CANDIDATES).tolist()
+        values = read_array(FUZZY_ENTITIES_ARRAY_VALUES).tolist()
 
-            rasa.shared.utils.io.dump_obj_as_json_to_file(
-                fuzzy_entities_file,
-                jsonpickle.encode(self.fuzzy_entities, unpicklable=True),
+        return [
+            FuzzyEntities.from_values(
+                name,
+                candidates[offsets[i] : offsets[i + 1]],
+                values[offsets[i] : offsets[i + 1]],
             )
+            for i, name in enumerate(names)
+        ]
 
     def _get_entities(
         self, training_data: TrainingData, domain: Domain
@@ -1,5 +1,11 @@
 from __future__ import annotations
+import hashlib
+import json
 import logging
+import os
+import tempfile
+from itertools import chain
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Text, Tuple, Type
 import numpy as np
 import scipy.sparse
@@ -8,6 +14,7 @@ from rasa.nlu.tokenizers.tokenizer import Tokenizer
 import rasa.shared.utils.io
 import rasa.utils.io
 import rasa.nlu.utils.pattern_utils as pattern_utils
+from rasa.engine.caching import CACHE_LOCATION_ENV, DEFAULT_CACHE_LOCATION
 from rasa.engine.graph import ExecutionContext, GraphComponent
 from rasa.engine.recipes.default_recipe import DefaultV1Recipe
 from rasa.engine.storage.resource import Resource
@@ -24,6 +31,22 @@ logger = logging.getLogger(__name__)
 
 FUZZY_ENTITIES_FILENAME = "fuzzy_featurizer.pkl"
 
+CONFIG_SENTENCE_SCORE_CUTOFF = "sentence_score_cutoff"
+CONFIG_WORD_SCORE_CUTOFF = "word_score_cutoff"
+CONFIG_CASE_SENSITIVE = "case_sensitive"
+CONFIG_WORKERS = "workers"
+CONFIG_BATCH_SIZE = "batch_size"
+CONFIG_TRAINING_CACHE = "training_cache"
+CONFIG_TRAINING_CACHE_DIRECTORY = "training_cache_directory"
+
+TRAINING_CACHE_DIRECTORY = "fuzzy_featurizer"
+
+FEATURIZED_ATTRIBUTES = [TEXT, RESPONSE, ACTION_TEXT]
+
+Features = Tuple[scipy.sparse.coo_matrix, scipy.sparse.coo_matrix]
+# Token (row) and element (column) indexes of the matches found for a lookup table
+Hits = Tuple[List[int], List[int]]
+
 
 @DefaultV1Recipe.register(
     DefaultV1Recipe.ComponentType.MESSAGE_FEATURIZER, is_trainable=True
@@ -37,7 +60,25 @@ class FuzzyFeaturizer(SparseFeaturizer, GraphComponent):
 
     @staticmethod
     def get_default_config() -> Dict[Text, Any]:
-        return {**SparseFeaturizer.get_default_config()}
+        return {
+            **SparseFeaturizer.get_default_config(),
+            # Score used to check if a sentence contains any of the elements of a lookup table
+            CONFIG_SENTENCE_SCORE_CUTOFF: 55,
+            # Score used to check if a token is one of the elements of a lookup table
+            CONFIG_WORD_SCORE_CUTOFF: 75,
+            # If the matching is case sensitive
+            CONFIG_CASE_SENSITIVE: False,
+            # Threads used by `process.cdist`, -1 uses all the cores
+            CONFIG_WORKERS: -1,
+            # Max number of messages scored together. Bounds the size of the score matrices
+            CONFIG_BATCH_SIZE: 128,
+            # Keep the hits of the training examples on disk, so unchanged examples are not
+            # scored again on the next training (e.g. `make train` or the hyperopt runs)
+            CONFIG_TRAINING_CACHE: False,
+            # Where the training cache is stored, defaults to a directory in the rasa cache
+            # (RASA_CACHE_DIRECTORY, relative to the working directory unless set)
+            CONFIG_TRAINING_CACHE_DIRECTORY: None,
+        }
 
     def __init__(
         self,
@@ -48,11 +89,18 @@ class FuzzyFeaturizer(SparseFeaturizer, GraphComponent):
         know_fuzzy_entities: Optional[List[Dict[Text, Any]]] = None,
     ) -> None:
         """Fetches the lookup tables information"""
-        super().__init__(execution_context.node_name, config)
+        super().__init__(
+            execution_context.node_name, {**self.get_default_config(), **config}
+        )
         self._model_storage = model_storage
         self._resource = resource
         self.know_fuzzy_entities = know_fuzzy_entities if know_fuzzy_entities else []
         self.finetune_mode = execution_context.is_finetuning
+        self.sentence_score_cutoff = self._config[CONFIG_SENTENCE_SCORE_CUTOFF]
+        self.word_score_cutoff = self._config[CONFIG_WORD_SCORE_CUTOFF]
+        self.case_sensitive = self._config[CONFIG_CASE_SENSITIVE]
+        self.workers = self._config[CONFIG_WORKERS]
+        self.batch_size = self._config[CONFIG_BATCH_SIZE]
 
     @classmethod
     def create(
@@ -67,30 +115,45 @@ class FuzzyFeaturizer(SparseFeaturizer, GraphComponent):
 
     def train(self, training_data: TrainingData) -> Resource:
         """Trains the component with all know look up tables"""
-
-        # This would be the place to use if we want to do pre-computing
-        # i.e. if we were transforming words to vectors, we would do it here
-
         for lookup_table in training_data.lookup_tables:
             lookup_elements = lookup_table["elements"]
 
             if not isinstance(lookup_elements, list):
                 lookup_elements = pattern_utils.read_lookup_table_file(lookup_elements)
 
-            # Load synonyms
-            # Dedupe ?
-            # Remove stop words ?
+            # Elements are stored processed and deduped, each one is a feature column
             self.know_fuzzy_entities.append(
-                {"name": lookup_table["name"], "elements": lookup_elements}
+                {
+                    "name": lookup_table["name"],
+                    "elements": list(
+                        dict.fromkeys(map(self._process_text, lookup_elements))
+                    ),
+                }
             )
 
         self._persist()
         return self._resource
 
     def process_training_data(self, training_data: TrainingData) -> TrainingData:
-        for example in training_data.training_examples:
-            for attribute in [TEXT, RESPONSE, ACTION_TEXT]:
-                self.process_message(example, attribute)
+        """Featurizes all the training examples, scoring them in batches.
+        The hits are reused from the training cache when the example and the lookup
+        tables haven't changed since the last training.
+        """
+        cache = None
+        cache_file = self._training_cache_file()
+        if cache_file is not None:
+            cache = self._read_training_cache(cache_file)
+
+        used_cache: Dict[Text, List[Hits]] = {}
+        for attribute in FEATURIZED_ATTRIBUTES:
+            self._featurize(
+                training_data.training_examples, attribute, cache, used_cache
+            )
+
+        if cache_file is not None and used_cache != cache:
+            # Only the entries of the current examples are kept, so the file doesn't grow
+            # with every change to the training data
+            self._write_training_cache(cache_file, used_cache)
 
         return training_data
 
@@ -100,88 +163,224 @@ class FuzzyFeaturizer(SparseFeaturizer, GraphComponent):
         Returns:
           the given list of messages which have been modified in-place
         """
-        for message in messages:
-            print(message.get(TEXT))
-            self.process_message(message, TEXT)
-
+        self._featurize(messages, TEXT)
         return messages
 
     def process_message(self, message: Message, attribute: Text) -> None:
-        if message.get(TEXT) is not None and "policy" in message.get(TEXT).lower():
-            print(message.get(TEXT))
+        self._featurize([message], attribute)
 
-        if attribute == TEXT and message.get(attribute) is not None:
-            print(message.get(attribute))
-
-        features_list = self._features_for_fuzzy_entities(message, attribute)
-
-        if features_list is None:
+    def _featurize(
+        self,
+        messages: List[Message],
+        attribute: Text,
+        cache: Optional[Dict[Text, List[Hits]]] = None,
+        used_cache: Optional[Dict[Text, List[Hits]]] = None,
+    ) -> None:
+        if not self.know_fuzzy_entities:
             return
 
-        for [sequence_features, sentence_features] in features_list:
+        pending = []
+        for message in messages:
+            if not message.get(attribute) or not message.get(TOKENS_NAMES[attribute]):
+                continue
+
+            key = None
+            if used_cache is not None:
+                key = self._training_cache_key(message, attribute)
+
+            if cache and key in cache:
+                used_cache[key] = cache[key]
+                self._add_fuzzy_features(message, attribute, cache[key])
+            else:
+                pending.append((message, key))
+
+        batch_size = max(self.batch_size, 1)
+        for batch_start in range(0, len(pending), batch_size):
+            batch = pending[batch_start : batch_start + batch_size]
+            batch_hits = self._find_fuzzy_entities(
+                [message for message, _ in batch], attribute
+            )
+            for (message, key), hits in zip(batch, batch_hits):
+                if used_cache is not None:
+                    used_cache[key] = hits
+                self._add_fuzzy_features(message, attribute, hits)
+
+    def _add_fuzzy_features(
+        self, message: Message, attribute: Text, hits: List[Hits]
+    ) -> None:
+        sequence_length = len(message.get(TOKENS_NAMES[attribute]))
+        for fuzzy_entity, (rows, columns) in zip(self.know_fuzzy_entities, hits):
+            sequence_features, sentence_features = self._to_coo(
+                rows, columns, sequence_length, len(fuzzy_entity["elements"])
+            )
             self.add_features_to_message(
                 sequence_features, sentence_features, attribute, message
             )
 
-    def _features_for_fuzzy_entities(
-        self, message: Message, attribute: Text
-    ) -> Optional[List[Tuple[scipy.sparse.coo_matrix, scipy.sparse.coo_matrix]]]:
-        """Process the message to find entities.
-        The algorithm tries to find the matches from the lookup tables using fuzzy search
-        It tries the whole message first and then it goes token by token to find the match.
-        The first goal is to use only one word and we might eventually add other heuristics
-        to support multiple words.
+    def _find_fuzzy_entities(
+        self, messages: List[Message], attribute: Text
+    ) -> List[List[Hits]]:
+        """Finds the elements of each lookup table in the messages.
+        The whole message is scored first against the elements to know which ones it could contain,
+        then each token is scored against those elements. The tokens of all the messages are deduped
+        and scored together in a single `process.cdist` call per lookup table.
+
+        Returns the (token, element) hits of each lookup table for every message.
         """
+        texts = [self._process_text(message.get(attribute)) for message in messages]
+        message_tokens = [
+            [
+                self._process_text(token.text)
+                for token in message.get(TOKENS_NAMES[attribute])
+            ]
+            for message in messages
+        ]
+        unique_tokens = list(dict.fromkeys(chain.from_iterable(message_tokens)))
+        token_ids = {token: token_id for token_id, token in enumerate(unique_tokens)}
+
+        hits: List[List[Hits]] = [[] for _ in messages]
+        for fuzzy_entity in self.know_fuzzy_entities:
+            elements = fuzzy_entity["elements"]
+            sentence_matches = self._matches(
+                texts, elements, fuzz.WRatio, self.sentence_score_cutoff
+            )
+            columns = np.flatnonzero(sentence_matches.any(axis=0))
+            token_matches = self._matches(
+                unique_tokens,
+                [elements[column] for column in columns],
+                fuzz.QRatio,
+                self.word_score_cutoff,
+            )
 
-        tokens = None
-        if self.know_fuzzy_entities and message.get(attribute):
-            tokens = message.get(TOKENS_NAMES[attribute], [])
+            for i, tokens in enumerate(message_tokens):
+                # A token only matches the elements found in the sentence of its message
+                rows, hit_columns = np.nonzero(
+                    token_matches[[token_ids[token] for token in tokens]]
+                    & sentence_matches[i, columns]
+                )
+                hits[i].append((rows.tolist(), columns[hit_columns].tolist()))
 
-        if not tokens:
-            return None
+        return hits
+
+    def _matches(
+        self,
+        queries: List[Text],
+        choices: List[Text],
+        scorer: Any,
+        score_cutoff: float,
+    ) -> np.ndarray:
+        """Boolean matrix telling which queries score at least `score_cutoff` against each choice"""
+        if not queries or not choices:
+            return np.zeros((len(queries), len(choices)), dtype=bool)
+
+        return (
+            process.cdist(
+                queries,
+                choices,
+                scorer=scorer,
+                score_cutoff=score_cutoff,
+                dtype=np.float32,
+                workers=self.workers,
+            )
+            >= score_cutoff
+        )
 
-        sequence_length = len(tokens)
-        # num_entity_types = len(self.know_fuzzy_entities)
+    @staticmethod
+    def _to_coo(
+        rows: List[int], columns: List[int], sequence_length: int, num_options: int
+    ) -> Features:
+        """Builds the sparse features straight from the hits; the sentence vector
+        contains all the elements found in any token"""
+        rows = np.asarray(rows, dtype=int)
+        columns = np.asarray(columns, dtype=int)
+        sequence_features = scipy.sparse.coo_matrix(
+            (np.ones(len(rows)), (rows, columns)),
+            shape=(sequence_length, num_options),
+        )
 
-        features: List[Tuple[scipy.sparse.coo_matrix, scipy.sparse.coo_matrix]] = []
+        sentence_columns = np.unique(columns)
+        sentence_features = scipy.sparse.coo_matrix(
+            (
+                np.ones(len(sentence_columns)),
+                (np.zeros(len(sentence_columns), dtype=int), sentence_columns),
+            ),
+            shape=(1, num_options),
+        )
 
-        for fuzzy_entity_index, fuzzy_entity in enumerate(self.know_fuzzy_entities):
-            fuzzy_result_list = process.extract(
-                message.get(attribute), fuzzy_entity["elements"], score_cutoff=55
-            )
+        return sequence_features, sentence_features
 
-            num_options = len(fuzzy_entity["elements"])
-
-            sequence_features = np.zeros([sequence_length, num_options])
-            sentence_features = np.zeros([1, num_options])
-
-            # ADapt to handle synonyms
-            if len(fuzzy_result_list) > 0:
-                for token_index, token in enumerate(tokens):
-                    fuzzy_entities = token.get("fuzzy_entities", default={})
-                    fuzzy_entities[fuzzy_entity["name"]] = False
-
-                    for fuzzy_result in fuzzy_result_list:
-                        ratio = fuzz.QRatio(token.text, fuzzy_result[0])
-                        if ratio > 0.75:
-                            fuzzy_entities[fuzzy_entity["name"]] = fuzzy_result[0]
-                            sequence_features[token_index][fuzzy_result[2]] = 1.0
-                            if attribute in [RESPONSE, TEXT, ACTION_TEXT]:
-                                # sentence vector should contain all patterns
-                                sentence_features[0][fuzzy_result[2]] = 1.0
-
-                    token.set("fuzzy_entities", fuzzy_entities)
-
-            if message.get(TEXT) is not None and "policy" in message.get(TEXT).lower():
-                print((sentence_features, sentence_features))
-            features.append(
-                (
-                    scipy.sparse.coo_matrix(sequence_features),
-                    scipy.sparse.coo_matrix(sentence_features),
-                )
+    def _training_cache_file(self) -> Optional[Path]:
+        """File holding the cached hits, addressed by the lookup tables and the config
+        that change the hits. None when the training cache is disabled."""
+        if not self._config[CONFIG_TRAINING_CACHE] or not self.know_fuzzy_entities:
+            return None
+
+        directory = self._config[CONFIG_TRAINING_CACHE_DIRECTORY]
+        if directory is None:
+            directory = (
+                Path(os.environ.get(CACHE_LOCATION_ENV, DEFAULT_CACHE_LOCATION))
+                / TRAINING_CACHE_DIRECTORY
             )
 
-        return features
+        fingerprint = self._hash(
+            {
+                "lookup_tables": self.know_fuzzy_entities,
+                CONFIG_SENTENCE_SCORE_CUTOFF: self.sentence_score_cutoff,
+                CONFIG_WORD_SCORE_CUTOFF: self.word_score_cutoff,
+                CONFIG_CASE_SENSITIVE: self.case_sensitive,
+            }
+        )
+        return Path(directory) / f"{fingerprint}.json"
+
+    def _training_cache_key(self, message: Message, attribute: Text) -> Text:
+        return self._hash(
+            [
+                attribute,
+                message.get(attribute),
+                [token.text for token in message.get(TOKENS_NAMES[attribute])],
+            ]
+        )
+
+    @staticmethod
+    def _hash(value: Any) -> Text:
+        return hashlib.sha256(
+            json.dumps(value, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def _read_training_cache(cache_file: Path) -> Dict[Text, List[Hits]]:
+        try:
+            with open(cache_file, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable training cache {cache_file}: {e}")
+            return {}
+
+    @staticmethod
+    def _write_training_cache(cache_file: Path, cache: Dict[Text, List[Hits]]) -> None:
+        """Writes to a temporary file that replaces the cache at once, so concurrent
+        trainings (e.g. hyperopt workers) never read a partially written cache"""
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=cache_file.parent,
+                prefix=cache_file.name,
+                delete=False,
+            ) as file:
+                json.dump(cache, file)
+            os.replace(file.name, cache_file)
+        except OSError as e:
+            logger.warning(f"Unable to write the training cache {cache_file}: {e}")
+
+    def _process_text(self, text: Text) -> Text:
+        if self.case_sensitive:
+            return text
+
+        return text.lower()
 
     @classmethod
     def load(
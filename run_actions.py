@@ -1,12 +1,15 @@
 import signal
 import sys
 
+import pluggy
 from prometheus_client import start_http_server
 from threading import Event
 from common import logging
 from common.config import app
+from common.requests import close_console_sessions
 
 from rasa_sdk.__main__ import main as rasa_sdk_main
+from rasa_sdk.plugin import plugin_manager
 
 logger = None
 
@@ -21,6 +24,17 @@ def handle_signal(signal, frame):
     event.set()
 
 
+class ConsoleSessionsPlugin:
+    """Closes the pooled console sessions when the action server stops"""
+
+    @pluggy.HookimplMarker("rasa_sdk")
+    def attach_sanic_app_extensions(self, app) -> None:
+        async def close_sessions(app, loop):
+            await close_console_sessions()
+
+        app.register_listener(close_sessions, "after_server_stop")
+
+
 signal.signal(signal.SIGTERM, handle_signal)
 
 
@@ -41,6 +55,7 @@ def main():
     if app.log_level == "DEBUG":
         sys.argv.extend(["--debug"])
 
+    plugin_manager().register(ConsoleSessionsPlugin())
     rasa_sdk_main()
 
 
@@ -0,0 +1,47 @@
+import asyncio
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.insights import activation_keys_actions
+
+_FORM = "form_inventory_create_activation_key"
+_SLOT = activation_keys_actions.ACTIVATION_KEY_NAME
+
+
+def test_create_activation_key_error_message(monkeypatch):
+    class ErrorResponse:
+        ok = False
+        status = 400
+
+    async def send_console_request(*args, **kwargs):
+        return ErrorResponse(), {"error": {"code": 400, "message": "name is taken"}}
+
+    monkeypatch.setattr(
+        activation_keys_actions, "send_console_request", send_console_request
+    )
+
+    tracker = Tracker(
+        "sender",
+        {"requested_slot": _SLOT, _SLOT: "my_key"},
+        {"text": "my key"},
+        [],
+        False,
+        None,
+        {"name": _FORM},
+        None,
+    )
+    dispatcher = CollectingDispatcher()
+    domain = {"forms": {_FORM: {"required_slots": [_SLOT]}}, "slots": {_SLOT: {}}}
+
+    asyncio.run(
+        activation_keys_actions.ValidateFormActivationKeyCreate().run(
+            dispatcher, tracker, domain
+        )
+    )
+
+    assert [message["response"] for message in dispatcher.messages] == [
+        "utter_inventory_create_activation_key_failure_1",
+        "utter_inventory_create_activation_key_failure_2",
+    ]
+    assert dispatcher.messages[1]["error_message"] == "name is taken"
@@ -1,5 +1,14 @@
+import asyncio
+
 import pytest
-from actions.slot_match import FuzzySlotMatch, FuzzySlotMatchOption, resolve_slot_match
+from actions.slot_match import (
+    FuzzySlotMatch,
+    FuzzySlotMatchOption,
+    SlotMatchCache,
+    resolve_slot_match,
+    suggest_top_k,
+    suggest_using_slot_match,
+)
 
 
 @pytest.mark.parametrize(
@@ -75,3 +84,85 @@ def test_slot_match_with_synonyms():
     resolved = resolve_slot_match("foobar", setting)
     assert resolved is not None
     assert "system" not in resolved
+
+
+def test_slot_match_keeps_the_first_accepted_option():
+    setting = FuzzySlotMatch(
+        "color",
+        [
+            FuzzySlotMatchOption(
+                "warm",
+                ["warm"],
+                sub_options=FuzzySlotMatch(
+                    "shade", [FuzzySlotMatchOption("reds"), FuzzySlotMatchOption("red")]
+                ),
+            ),
+            FuzzySlotMatchOption("red"),
+        ],
+    )
+
+    assert resolve_slot_match("red", setting) == {"color": "warm", "shade": "reds"}
+
+
+def test_compiled_slot_match_cannot_go_stale():
+    os_match = FuzzySlotMatch("os", [FuzzySlotMatchOption("rhel", ["rhel", "redhat"])])
+    setting = FuzzySlotMatch(
+        "system", [FuzzySlotMatchOption("linux", ["linux"], os_match)]
+    )
+    assert resolve_slot_match("redhat", setting) == {"system": "linux", "os": "rhel"}
+
+    # Neither the options, their synonyms nor the sub options can be changed in place
+    with pytest.raises(TypeError):
+        os_match.options[0].synonyms[1] = "fedora"
+    with pytest.raises(AttributeError):
+        os_match.options[0].synonyms = ("rhel", "fedora")
+    with pytest.raises(AttributeError):
+        setting.options = []
+    with pytest.raises(AttributeError):
+        setting.options[0].sub_options = None
+    assert resolve_slot_match("fedora", setting) == {}
+    assert resolve_slot_match("redhat", setting) == {"system": "linux", "os": "rhel"}
+
+
+def test_suggest_top_k():
+    setting = FuzzySlotMatch(
+        "service",
+        [
+            FuzzySlotMatchOption("advisor", ["advisor", "recommendations"]),
+            FuzzySlotMatchOption("inventory", ["inventory", "systems"]),
+            FuzzySlotMatchOption("patch", ["patch", "advisories"]),
+            FuzzySlotMatchOption("vulnerability", ["vulnerability", "cves"]),
+        ],
+    )
+
+    suggestions = suggest_top_k("advisr", setting, 2, accepted_rate=10)
+    assert [suggestion["value"] for suggestion in suggestions] == ["advisor", "patch"]
+    assert suggestions[0]["ratio"] > suggestions[1]["ratio"]
+
+    everything = suggest_using_slot_match("advisr", setting, accepted_rate=10)
+    assert everything[:2] == suggestions
+    assert len({suggestion["value"] for suggestion in everything}) == len(everything)
+    assert suggest_top_k("advisr", setting, 0) == []
+
+
+def test_slot_match_cache():
+    cache = SlotMatchCache(2)
+    created = []
+
+    async def create(value):
+        created.append(value)
+        if value is None:
+            return None
+        return FuzzySlotMatch("system", [FuzzySlotMatchOption(value)])
+
+    async def get(key, value):
+        return await cache.get_or_create(key, lambda: create(value))
+
+    first = asyncio.run(get("rhel", "rhel"))
+    assert asyncio.run(get("rhel", "changed")) is first
+    assert resolve_slot_match("rhel", first) == {"system": "rhel"}
+
+    # Failures are not cached
+    assert asyncio.run(get("broken", None)) is None
+    assert asyncio.run(get("broken", "fedora")) is not None
+    assert created == ["rhel", None, "fedora"]
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import jwt
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from common import auth
+from common.header import Header
+
+
+def test_local_dev_token_is_refreshed_once_and_cached(monkeypatch):
+    refreshes = []
+    expires_in = [3600]
+
+    async def token(request):
+        refreshes.append((await request.post())["refresh_token"])
+        await asyncio.sleep(0.05)
+        access_token = jwt.encode(
+            {"exp": time.time() + expires_in[0]},
+            "a-secret-long-enough-for-hs256-key",
+            algorithm="HS256",
+        )
+        return web.json_response({"access_token": access_token})
+
+    async def authorization():
+        headers = await auth.get_auth_header(None, Header())
+        return headers.build_headers()["Authorization"]
+
+    async def main():
+        web_app = web.Application()
+        web_app.router.add_post("/token", token)
+        async with TestServer(web_app) as server:
+            monkeypatch.setattr(auth, "local_dev_token", None)
+            monkeypatch.setattr(auth, "_scheduled_refresh", None)
+            monkeypatch.setattr(auth.app, "is_running_locally", True)
+            monkeypatch.setattr(auth.app, "dev_offline_refresh_token", "offline")
+            monkeypatch.setattr(
+                auth.app, "dev_sso_refresh_token_url", str(server.make_url("/token"))
+            )
+
+            first, second = await asyncio.gather(authorization(), authorization())
+            assert first == second
+            assert await authorization() == first
+            assert refreshes == ["offline"]
+
+            # Refreshed before it expires
+            auth.local_dev_token.expires_at = (
+                time.time() + auth.TOKEN_REFRESH_MARGIN - 1
+            )
+            await authorization()
+            assert len(refreshes) == 2
+
+            # Short lived tokens are refreshed in the background before requests need to
+            expires_in[0] = (
+                auth.TOKEN_REFRESH_MARGIN + auth.TOKEN_BACKGROUND_REFRESH_MARGIN + 0.2
+            )
+            auth.local_dev_token.expires_at = time.time()
+            short_lived = await authorization()
+            assert len(refreshes) == 3
+
+            expires_in[0] = 3600
+            await asyncio.sleep(0.5)
+            assert len(refreshes) == 4
+            assert await authorization() != short_lived
+            assert len(refreshes) == 4
+
+    asyncio.run(main())
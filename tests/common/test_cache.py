@@ -0,0 +1,48 @@
+import subprocess
+import sys
+
+from common.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.hits == 3
+    assert cache.misses == 1
+
+
+def test_lru_cache_ttl():
+    now = [100.0]
+    cache = LRUCache(10, ttl=5, timer=lambda: now[0])
+    cache.set("a", 1)
+
+    now[0] = 104.0
+    assert cache.get("a") == 1
+
+    now[0] = 105.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(0)
+    cache.set("a", 1)
+
+    assert cache.get("a", "default") == "default"
+
+
+def test_unnamed_cache_does_not_import_metrics():
+    script = (
+        "import sys; from common.cache import LRUCache; LRUCache(2).get('key'); "
+        "assert 'common.metrics' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
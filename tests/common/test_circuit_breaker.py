@@ -0,0 +1,89 @@
+import pytest
+
+from common.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+def call(breaker, success=True, seconds=0.1):
+    breaker.acquire()
+    breaker.release(success, seconds)
+
+
+def test_opens_on_failure_rate_and_probes_when_half_open():
+    now = [0]
+    breaker = CircuitBreaker(
+        "advisor",
+        failure_rate=0.5,
+        window=4,
+        min_calls=4,
+        open_seconds=10,
+        timer=lambda: now[0],
+    )
+
+    call(breaker, False)
+    call(breaker)
+    call(breaker, False)
+    assert breaker.state is CircuitState.CLOSED
+    call(breaker)
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    # A single probe once open_seconds elapsed, a failed probe opens it again
+    now[0] = 10
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.release(False, 0.1)
+    assert breaker.state is CircuitState.OPEN
+
+    now[0] = 20
+    call(breaker)
+    assert breaker.state is CircuitState.CLOSED
+    call(breaker)
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("advisor", slow_call_seconds=1, window=2, min_calls=2)
+    call(breaker, seconds=2)
+    call(breaker, seconds=2)
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_adaptive_timeout():
+    breaker = CircuitBreaker("advisor", latency_samples=100)
+    for _ in range(19):
+        call(breaker, seconds=0.5)
+    assert breaker.timeout(5) == 5
+
+    call(breaker, seconds=0.5)
+    assert breaker.timeout(5) == 1.5
+    assert breaker.timeout(5, min_seconds=2) == 2
+    assert breaker.timeout(1) == 1
+
+    # Failed calls don't tell how long the backend takes
+    call(breaker, False, seconds=10)
+    assert breaker.timeout(5) == 1.5
+
+
+def test_cancelled_calls_are_not_recorded():
+    now = [0]
+    breaker = CircuitBreaker(
+        "advisor", window=2, min_calls=2, open_seconds=10, timer=lambda: now[0]
+    )
+    for _ in range(3):
+        breaker.acquire()
+        breaker.cancel()
+    assert breaker.state is CircuitState.CLOSED
+
+    call(breaker, False)
+    call(breaker, False)
+    assert breaker.state is CircuitState.OPEN
+
+    # A cancelled probe lets another one through
+    now[0] = 10
+    breaker.acquire()
+    breaker.cancel()
+    assert breaker.state is CircuitState.HALF_OPEN
+    call(breaker)
+    assert breaker.state is CircuitState.CLOSED
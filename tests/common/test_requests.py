@@ -0,0 +1,463 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from common import requests as console_requests
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Runs `test()` against a fake advisor backend serving the given routes"""
+
+    async def get_auth_header(tracker, headers):
+        return headers
+
+    monkeypatch.setattr(console_requests, "get_auth_header", get_auth_header)
+
+    def run(routes, test):
+        async def main():
+            web_app = web.Application()
+            web_app.router.add_routes(routes)
+            async with TestServer(web_app) as server:
+                monkeypatch.setitem(
+                    console_requests.console_backends,
+                    "advisor",
+                    console_requests.ConsoleBackend(
+                        "advisor",
+                        str(server.make_url("")),
+                        timeout=5,
+                        pool_size=10,
+                        cache_ttl=10,
+                        cache_stale_ttl=5,
+                    ),
+                )
+                try:
+                    return await test()
+                finally:
+                    await console_requests.close_console_sessions()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_sessions_are_shared_per_backend(backend):
+    async def hello(request):
+        return web.json_response({"hello": "world"})
+
+    async def test():
+        first, content = await console_requests.send_console_request(
+            "advisor", "/hello", None
+        )
+        second, _ = await console_requests.send_console_request(
+            "advisor", "/hello", None
+        )
+        assert first.ok and second.ok
+        assert content == {"hello": "world"}
+
+        sessions = console_requests.console_sessions
+        backends = console_requests.console_backends
+        session = sessions.get(backends["advisor"])
+        assert session is sessions.get(backends["advisor"])
+        assert session is not sessions.get(backends["rbac"])
+        return session
+
+    session = backend([web.get("/hello", hello)], test)
+    assert session.closed
+
+
+def test_console_backends(monkeypatch):
+    monkeypatch.setenv("TIMEOUT__CHROME_SERVICE", "1.5")
+
+    backend = console_requests.ConsoleBackend.from_config(
+        "chrome-service", "http://chrome"
+    )
+    assert backend.url == "http://chrome"
+    assert backend.timeout == 1.5
+    assert backend.pool_size == console_requests.app.requests_pool_size
+
+    assert console_requests.get_console_backend("rbac").name == "rbac"
+    with pytest.raises(ValueError):
+        console_requests.get_console_backend("foobar")
+
+
+def test_cached_get_requests(backend, monkeypatch):
+    now = [0]
+    cache = console_requests.ResponseCache(10, timer=lambda: now[0])
+    monkeypatch.setattr(console_requests, "response_cache", cache)
+    monkeypatch.setattr(
+        console_requests,
+        "get_decoded_user_identity",
+        lambda tracker: {"identity": {"org_id": tracker}},
+    )
+    calls = []
+
+    async def catalog(request):
+        calls.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response({"calls": len(calls)}, headers={"ETag": '"v1"'})
+
+    async def get(at, scope=console_requests.CACHE_SCOPE_GLOBAL, org="org1"):
+        now[0] = at
+        response, content = await console_requests.send_console_request(
+            "advisor", "/catalog", org, cache_scope=scope
+        )
+        assert response.ok
+        return content
+
+    async def test():
+        assert await get(0) == {"calls": 1}
+        assert await get(5) == {"calls": 1}
+        assert calls == [None]
+
+        # Stale, served while revalidated in the background
+        assert await get(12) == {"calls": 1}
+        await asyncio.gather(*cache._refreshing.values())
+        assert calls == [None, '"v1"']
+        assert await get(20) == {"calls": 1}
+
+        # Expired, revalidated before answering
+        assert await get(40) == {"calls": 1}
+        assert calls == [None, '"v1"', '"v1"']
+
+        # Org scoped responses are cached per org
+        assert await get(40, console_requests.CACHE_SCOPE_ORG) == {"calls": 4}
+        assert await get(41, console_requests.CACHE_SCOPE_ORG) == {"calls": 4}
+        assert await get(41, console_requests.CACHE_SCOPE_ORG, "org2") == {"calls": 5}
+
+        # Uncached requests always reach the backend
+        assert await get(41, None) == {"calls": 6}
+
+    backend([web.get("/catalog", catalog)], test)
+
+
+def test_cached_responses_do_not_keep_the_request(backend, monkeypatch):
+    monkeypatch.setattr(
+        console_requests, "response_cache", console_requests.ResponseCache(10)
+    )
+
+    async def catalog(request):
+        return web.json_response({"items": [1]}, headers={"ETag": '"v1"'})
+
+    async def get():
+        return await console_requests.send_console_request(
+            "advisor",
+            "/catalog",
+            None,
+            cache_scope=console_requests.CACHE_SCOPE_GLOBAL,
+        )
+
+    async def test():
+        first, first_content = await get()
+        first_content["items"].append(2)
+        second, second_content = await get()
+
+        assert isinstance(second, console_requests.ConsoleResponse)
+        assert not hasattr(second, "request_info")
+        assert second.ok and second.status == 200
+        assert second.headers["ETag"] == '"v1"'
+        assert second.content_type == "application/json"
+        with pytest.raises(AttributeError):
+            second.status = 500
+
+        # Each caller decodes its own copy of the cached content
+        assert second_content == {"items": [1]}
+
+    backend([web.get("/catalog", catalog)], test)
+
+
+def test_concurrent_get_requests_are_coalesced(backend, monkeypatch):
+    calls = []
+
+    async def slow(request):
+        calls.append(request.headers.get("x-user"))
+        await asyncio.sleep(0.05)
+        return web.json_response({"calls": len(calls)})
+
+    def headers(user):
+        headers = console_requests.Header()
+        headers.add_header("x-user", user)
+        return headers
+
+    async def test():
+        results = await asyncio.gather(
+            *[
+                console_requests.send_console_request(
+                    "advisor", "/slow", None, headers=headers(user)
+                )
+                for user in ["a", "a", "a", "b"]
+            ]
+        )
+        contents = [content for _, content in results]
+        assert contents == [{"calls": 2}] * 4
+        # Each caller gets its own copy
+        assert contents[0] is not contents[1]
+
+    backend([web.get("/slow", slow)], test)
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_gather_console_requests(backend):
+    async def fast(request):
+        return web.json_response({"fast": True})
+
+    async def slow(request):
+        await asyncio.sleep(1)
+        return web.json_response({"slow": True})
+
+    async def broken(request):
+        return web.Response(status=503, text="unavailable")
+
+    async def test():
+        started = asyncio.get_running_loop().time()
+        (fast_response, fast_content), slow_result, broken_result, status = (
+            await console_requests.gather_console_requests(
+                None,
+                console_requests.ConsoleRequest("advisor", "/fast"),
+                console_requests.ConsoleRequest("advisor", "/slow"),
+                console_requests.ConsoleRequest("advisor", "/broken"),
+                console_requests.ConsoleRequest(
+                    "advisor", "/fast", fetch_content=False
+                ),
+                timeout=0.2,
+            )
+        )
+        assert asyncio.get_running_loop().time() - started < 1
+
+        assert fast_response.ok and fast_content == {"fast": True}
+        assert status.ok
+        assert isinstance(slow_result[0], console_requests.FailedResponse)
+        assert slow_result[1] is None
+        assert broken_result[0].status == 503
+
+    backend(
+        [web.get("/fast", fast), web.get("/slow", slow), web.get("/broken", broken)],
+        test,
+    )
+
+
+def test_failing_backend_opens_circuit(backend):
+    calls = []
+
+    async def broken(request):
+        calls.append(request.path)
+        return web.Response(status=503, text="unavailable")
+
+    async def test():
+        circuit_breaker = console_requests.console_backends["advisor"].circuit_breaker
+        for _ in range(circuit_breaker.min_calls + 2):
+            response, _ = await console_requests.send_console_request(
+                "advisor", "/broken", None
+            )
+            assert not response.ok
+
+        assert isinstance(response, console_requests.FailedResponse)
+
+    backend([web.get("/broken", broken)], test)
+    assert len(calls) == 10
+
+
+def test_transient_errors_are_retried(backend, monkeypatch):
+    calls = []
+
+    async def flaky(request):
+        calls.append(request.method)
+        if len(calls) % 2:
+            return web.Response(status=503, text="unavailable")
+        return web.json_response({"calls": len(calls)})
+
+    def idempotency_key():
+        headers = console_requests.Header()
+        headers.add_header(console_requests.IDEMPOTENCY_KEY_HEADER, "key")
+        return headers
+
+    async def test():
+        advisor = console_requests.console_backends["advisor"]
+        monkeypatch.setattr(advisor, "retries", 2)
+        monkeypatch.setattr(advisor, "retry_backoff", 0.01)
+
+        response, content = await console_requests.send_console_request(
+            "advisor", "/flaky", None
+        )
+        assert response.ok and content == {"calls": 2}
+
+        # POSTs are only retried with an idempotency key
+        response, _ = await console_requests.send_console_request(
+            "advisor", "/flaky", None, "post", headers=idempotency_key()
+        )
+        assert response.status == 200
+        response, _ = await console_requests.send_console_request(
+            "advisor", "/flaky", None, "post"
+        )
+        assert response.status == 503
+        assert calls == ["GET", "GET", "POST", "POST", "POST"]
+
+        # Nor past the deadline
+        monkeypatch.setattr(advisor, "retry_deadline", 0)
+        calls.clear()
+        response, _ = await console_requests.send_console_request(
+            "advisor", "/flaky", None
+        )
+        assert response.status == 503
+
+    backend([web.get("/flaky", flaky), web.post("/flaky", flaky)], test)
+    assert calls == ["GET"]
+
+
+def test_decoded_content(backend, monkeypatch):
+    async def events(request):
+        return web.json_response(
+            {
+                "meta": {"count": 2},
+                "data": [
+                    {"id": 1, "name": "a", "description": "..."},
+                    {"id": 2, "name": "b", "description": "..."},
+                ],
+            }
+        )
+
+    async def large(request):
+        return web.Response(body=b"x" * 2048)
+
+    async def test():
+        _, content = await console_requests.send_console_request(
+            "advisor", "/events", None, fields=["id", "name"]
+        )
+        assert content == {
+            "meta": {"count": 2},
+            "data": [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}],
+        }
+
+        monkeypatch.setattr(
+            console_requests.console_backends["advisor"], "max_body_size", 1024
+        )
+        response, content = await console_requests.send_console_request(
+            "advisor", "/large", None
+        )
+        assert isinstance(response, console_requests.FailedResponse)
+        assert content is None
+
+    backend([web.get("/events", events), web.get("/large", large)], test)
+
+
+def test_gather_console_requests_with_cancelled_request(backend, monkeypatch):
+    async def cancelled(app_name, path, tracker, method, **kwargs):
+        raise asyncio.CancelledError()
+
+    async def test():
+        monkeypatch.setattr(console_requests, "send_console_request", cancelled)
+        (response, content), status = await console_requests.gather_console_requests(
+            None,
+            console_requests.ConsoleRequest("advisor", "/cancelled"),
+            console_requests.ConsoleRequest(
+                "advisor", "/cancelled", fetch_content=False
+            ),
+        )
+        assert isinstance(response, console_requests.FailedResponse)
+        assert content is None
+        assert isinstance(status, console_requests.FailedResponse)
+
+    backend([], test)
+
+
+def test_retries_stay_within_the_deadline(backend, monkeypatch):
+    calls = []
+
+    async def slow_failure(request):
+        calls.append(request.path)
+        await asyncio.sleep(0.3)
+        return web.Response(status=503, text="unavailable")
+
+    async def test():
+        advisor = console_requests.console_backends["advisor"]
+        monkeypatch.setattr(advisor, "retries", 2)
+        monkeypatch.setattr(advisor, "retry_backoff", 0.01)
+        monkeypatch.setattr(advisor, "retry_deadline", 0.5)
+
+        started = asyncio.get_running_loop().time()
+        response, _ = await console_requests.send_console_request(
+            "advisor", "/slow-failure", None
+        )
+        assert not response.ok
+        assert asyncio.get_running_loop().time() - started < 0.7
+
+    backend([web.get("/slow-failure", slow_failure)], test)
+    assert len(calls) == 2
+
+
+def test_error_content_is_decoded_with_body_limit(backend, monkeypatch):
+    async def create(request):
+        return web.json_response(
+            {"error": {"code": 400, "message": "name should be unique"}}, status=400
+        )
+
+    async def test():
+        monkeypatch.setattr(
+            console_requests.console_backends["advisor"], "max_body_size", 1024
+        )
+        response, content = await console_requests.send_console_request(
+            "advisor", "/activation_keys", None, "post", json={"name": "key"}
+        )
+        assert response.status == 400
+        assert content["error"]["message"] == "name should be unique"
+
+    backend([web.post("/activation_keys", create)], test)
+
+
+def test_non_ok_response_body_is_logged_truncated(backend, monkeypatch):
+    errors = []
+    monkeypatch.setattr(
+        console_requests.logger,
+        "error",
+        lambda message, **kwargs: errors.append(message),
+    )
+
+    async def broken(request):
+        return web.Response(status=500, text="é" + "x" * 4096)
+
+    async def test():
+        response, content = await console_requests.send_console_request(
+            "advisor", "/broken", None
+        )
+        assert response.status == 500
+        assert len(content) == 4097
+
+    backend([web.get("/broken", broken)], test)
+    assert errors == [
+        "Received non OK~sh response from call GET "
+        + console_requests.console_backends["advisor"].url
+        + "/broken: (500) - é"
+        + "x" * 1022
+    ]
+
+
+def test_cookies_are_not_shared_between_users(backend, monkeypatch):
+    async def login(request):
+        response = web.json_response({"cookie": request.headers.get("Cookie")})
+        response.set_cookie("session", "user-" + request.headers["x-user"])
+        return response
+
+    def headers(user):
+        headers = console_requests.Header()
+        headers.add_header("x-user", user)
+        return headers
+
+    async def test():
+        # Cookies of IP addresses are ignored anyway
+        advisor = console_requests.console_backends["advisor"]
+        monkeypatch.setattr(
+            advisor, "url", advisor.url.replace("127.0.0.1", "localhost")
+        )
+        _, first = await console_requests.send_console_request(
+            "advisor", "/login", None, headers=headers("userA")
+        )
+        _, second = await console_requests.send_console_request(
+            "advisor", "/login", None, headers=headers("userB")
+        )
+        assert first == {"cookie": None}
+        assert second == {"cookie": None}
+
+    backend([web.get("/login", login)], test)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from common.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_shared():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def call(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def test():
+        results = await asyncio.gather(
+            single_flight.do("key", lambda: call(1)),
+            single_flight.do("key", lambda: call(2)),
+            single_flight.do("other", lambda: call(3)),
+        )
+        assert results == [1, 1, 3]
+        assert len(single_flight) == 0
+
+        # Done calls are not reused
+        assert await single_flight.do("key", lambda: call(4)) == 4
+
+    asyncio.run(test())
+    assert calls == [1, 3, 4]
+
+
+def test_errors_are_shared():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def test():
+        results = await asyncio.gather(
+            single_flight.do("key", fail),
+            single_flight.do("key", fail),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+        with pytest.raises(ValueError):
+            await single_flight.do("key", fail)
+
+    asyncio.run(test())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def test():
+        first = asyncio.ensure_future(single_flight.do("key", call))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(single_flight.do("key", call))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        assert await second == "done"
+        assert first.cancelled()
+        assert len(single_flight) == 0
+
+    asyncio.run(test())
+    assert calls == [1]
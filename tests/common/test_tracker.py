@@ -0,0 +1,144 @@
+import base64
+import json
+from unittest import mock
+
+from rasa_sdk import Tracker
+
+from common.rasa import tracker as rasa_tracker
+
+
+def _identity(org_id="org1", is_internal=True):
+    return base64.b64encode(
+        json.dumps(
+            {"identity": {"org_id": org_id, "user": {"is_internal": is_internal}}}
+        ).encode()
+    ).decode()
+
+
+def _tracker(*events):
+    return Tracker("sender", {}, {}, list(events), False, None, {}, None)
+
+
+def _user_event(**metadata):
+    return {"event": "user", "text": "hello", "metadata": metadata}
+
+
+def test_identity_context(monkeypatch):
+    monkeypatch.setattr(rasa_tracker.app, "is_running_locally", False)
+    decode_identity = mock.Mock(wraps=rasa_tracker.decode_identity)
+    monkeypatch.setattr(rasa_tracker, "decode_identity", decode_identity)
+
+    tracker = _tracker(
+        _user_event(identity=_identity("org0", False), email="old@somewhere"),
+        {"event": "action", "name": "action_listen"},
+        _user_event(identity=_identity(), is_org_admin=True, email="user@somewhere"),
+        {"event": "action", "name": "action_core_pre_process"},
+    )
+
+    context = rasa_tracker.get_identity_context(tracker)
+    assert context.org_id == "org1"
+    assert context.is_org_admin is True
+    assert context.is_internal is True
+    assert context.email == "user@somewhere"
+
+    assert rasa_tracker.get_identity_context(tracker) is context
+    assert rasa_tracker.get_is_internal(tracker) is True
+    assert (
+        rasa_tracker.get_decoded_user_identity(tracker)["identity"]["org_id"] == "org1"
+    )
+    decode_identity.assert_called_once()
+
+
+def test_identity_context_without_user_message(monkeypatch):
+    monkeypatch.setattr(rasa_tracker.app, "is_running_locally", False)
+
+    tracker = _tracker({"event": "action", "name": "action_listen"})
+    context = rasa_tracker.get_identity_context(tracker)
+    assert context.identity is None
+    assert context.org_id is None
+    assert context.is_org_admin is False
+    assert context.is_internal is False
+    assert rasa_tracker.get_email(tracker) == "email not provided"
+
+
+def test_tracker_view():
+    events = [
+        _user_event(current_url="/old"),
+        {"event": "action", "name": "action_listen"},
+        _user_event(current_url="/insights"),
+        {"event": "action", "name": "action_core_pre_process"},
+    ]
+    tracker = _tracker(*events)
+
+    view = rasa_tracker.get_tracker_view(tracker)
+    assert view.latest_user_event_index == 2
+    assert rasa_tracker.get_last_user_message(tracker) is events[2]
+    assert rasa_tracker.get_current_url(tracker) == "/insights"
+    assert rasa_tracker.get_events_since_last_user_message(tracker) == events[2:]
+    assert rasa_tracker.get_tracker_view(tracker) is view
+
+    # Rebuilt when events are added
+    tracker.events.append(_user_event(current_url="/openshift"))
+    assert rasa_tracker.get_current_url(tracker) == "/openshift"
+    assert rasa_tracker.get_tracker_view(tracker) is not view
+
+    assert rasa_tracker.get_events_since_last_user_message(_tracker()) == []
+    assert rasa_tracker.get_current_url(_tracker()) is None
+
+
+def test_window_tracker_state():
+    action_listen = {"event": "action", "name": "action_listen"}
+    events = [
+        _user_event(),
+        {"event": "session_started"},
+        {"event": "active_loop", "name": "form_feedback"},
+        *[_user_event(), action_listen] * 5,
+    ]
+
+    state = rasa_tracker.window_tracker_state(
+        {"sender_id": "sender", "events": events}, 4
+    )
+    assert state["sender_id"] == "sender"
+    # The active loop is kept, the events before the session start are not
+    assert state["events"][1:] == events[2:]
+
+    events[2] = action_listen
+    state = rasa_tracker.window_tracker_state({"events": events}, 4)
+    assert state["events"][1:] == events[-4:]
+
+    tracker = _tracker(*state["events"])
+    summary = rasa_tracker.get_events_summary(tracker)
+    assert (summary.total, summary.dropped) == (13, 9)
+    assert rasa_tracker.get_last_user_message(tracker) is events[-2]
+
+    summary = rasa_tracker.get_events_summary(_tracker(*events))
+    assert (summary.total, summary.dropped) == (13, 0)
+
+    # The latest user message is kept, even past the cap
+    events = [
+        {"event": "session_started"},
+        _user_event(identity="identity"),
+        *[{"event": "slot", "name": "slot", "value": index} for index in range(30)],
+    ]
+    state = rasa_tracker.window_tracker_state({"events": events}, 20)
+    assert state["events"][1:] == events[1:]
+    tracker = _tracker(*state["events"])
+    assert rasa_tracker.get_last_user_message(tracker) is events[1]
+
+
+def test_identity_context_with_malformed_identity(monkeypatch):
+    monkeypatch.setattr(rasa_tracker.app, "is_running_locally", False)
+    decode_identity = mock.Mock(wraps=rasa_tracker.decode_identity)
+    monkeypatch.setattr(rasa_tracker, "decode_identity", decode_identity)
+
+    tracker = _tracker(
+        _user_event(identity="not-base64!", is_org_admin=True, email="user@somewhere")
+    )
+
+    # Forwarded as is, without decoding it
+    assert rasa_tracker.get_user_identity(tracker) == "not-base64!"
+    assert rasa_tracker.get_is_org_admin(tracker) is True
+    assert rasa_tracker.get_email(tracker) == "user@somewhere"
+    decode_identity.assert_not_called()
+
+    assert rasa_tracker.get_is_internal(tracker) is False
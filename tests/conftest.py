@@ -0,0 +1,20 @@
+import os
+import sys
+from unittest import mock
+
+# The modules under test read the app config when imported, collect them as if running locally
+_local_environ = mock.patch.dict(
+    os.environ, {"IS_RUNNING_LOCALLY": "true", "__DOT_ENV_FILE": ".i-dont-exist"}
+)
+
+
+def pytest_sessionstart(session):
+    _local_environ.start()
+
+
+def pytest_collection_finish(session):
+    _local_environ.stop()
+
+    # Leave the app config for the config tests to import
+    for module in ["common.config", "common.config.app"]:
+        sys.modules.pop(module, None)
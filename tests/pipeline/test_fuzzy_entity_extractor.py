@@ -1,5 +1,10 @@
+from pathlib import Path
 from typing import Text, Dict, List
 
+import pytest
+from rapidfuzz import fuzz
+from rasa.engine.storage.local_model_storage import LocalModelStorage
+from rasa.engine.storage.resource import Resource
 from rasa.nlu.constants import TOKENS_NAMES
 from rasa.nlu.tokenizers.whitespace_tokenizer import WhitespaceTokenizer
 from rasa.shared.nlu.constants import (
@@ -15,6 +20,9 @@ from pipeline.fuzzy_entity_extractor import (
     FuzzyEntityExtractor,
     FuzzyEntities,
     CONFIG_CASE_SENSITIVE,
+    CONFIG_VECTORIZED,
+    CONFIG_CACHE_SIZE,
+    CONFIG_BATCH_SIZE,
 )
 
 
@@ -87,6 +95,24 @@ def _create_test_entity_extractor_with_reconciliation(
     )
 
 
+def test_fuzzy_entities_candidates_resolve_to_values():
+    entities = FuzzyEntities(
+        "size",
+        ["big", "small"],
+        {"large": "big", "tiny": "small", "huge": "big", "crimson": "red"},
+    )
+
+    assert entities.candidates == ["big", "small", "large", "tiny", "huge"]
+    assert entities.values == ["big", "small"]
+    assert [entities.value_of(i) for i in range(len(entities.candidates))] == [
+        "big",
+        "small",
+        "big",
+        "small",
+        "big",
+    ]
+
+
 def _highlight(text: Text, entities: List[Dict]):
     """Helper, prints the before text and after text of a match. Used to debug"""
     for entity in entities:
@@ -328,3 +354,130 @@ def test_color_extraction_with_reconciliation():
         ENTITY_ATTRIBUTE_END: 217,
         ENTITY_ATTRIBUTE_VALUE: "red",
     }
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Hello world I like red and cyan. Olive is also good color. I would like a large milkshake",
+        "I found out that lapis lazuli is a synonym for blue. I would like a swandich of consderble size",
+        "I love blue, light blue and navy blue. I do also love red color, multiple shades of red like scarlet, ruby red",
+    ],
+)
+def test_vectorized_extraction_matches_default(text: Text):
+    def sort_key(entity: Dict):
+        return (
+            entity[ENTITY_ATTRIBUTE_TYPE],
+            entity[ENTITY_ATTRIBUTE_START],
+            entity[ENTITY_ATTRIBUTE_END],
+        )
+
+    expected = _create_test_entity_extractor().extract_entities(_create_message(text))
+    entities = _create_test_entity_extractor(
+        {**FuzzyEntityExtractor.get_default_config(), CONFIG_VECTORIZED: True}
+    ).extract_entities(_create_message(text))
+
+    assert len(entities) > 0
+    assert sorted(entities, key=sort_key) == sorted(expected, key=sort_key)
+
+
+def test_persist_and_load(tmp_path: Path):
+    model_storage = LocalModelStorage(tmp_path)
+    resource = Resource("fuzzy_entity_extractor")
+    trained = _create_test_entity_extractor()
+    trained._model_storage = model_storage
+    trained._resource = resource
+    trained._persist()
+
+    loaded = FuzzyEntityExtractor.load(
+        FuzzyEntityExtractor.get_default_config(), model_storage, resource, object()
+    )
+
+    assert len(loaded.fuzzy_entities) == len(trained.fuzzy_entities)
+    for loaded_entities, trained_entities in zip(
+        loaded.fuzzy_entities, trained.fuzzy_entities
+    ):
+        assert loaded_entities.name == trained_entities.name
+        assert loaded_entities.candidates == trained_entities.candidates
+        assert loaded_entities.values == trained_entities.values
+        assert list(loaded_entities.value_ids) == list(trained_entities.value_ids)
+
+    text = "I found out that lapis lazuli is a synonym for blue. I would like a swandich of consderble size"
+    assert loaded.extract_entities(_create_message(text)) == trained.extract_entities(
+        _create_message(text)
+    )
+
+
+def test_cached_process_message():
+    extractor = _create_test_entity_extractor(
+        {**FuzzyEntityExtractor.get_default_config(), CONFIG_CACHE_SIZE: 10}
+    )
+
+    first = _create_message("slack and cyan")
+    second = _create_message("Slack and Cyan")
+    extractor.process_message(first)
+    extractor.process_message(second)
+
+    assert extractor.cache.misses == 1
+    assert extractor.cache.hits == 1
+    assert first.get("entities") == second.get("entities")
+    assert first.get("entities")[0] is not second.get("entities")[0]
+    assert first.get("entities")[0][ENTITY_ATTRIBUTE_VALUE] == "blue"
+
+
+def test_reconciliation_resolves_chained_overlaps():
+    # (start, end, candidate id, score)
+    hits = [
+        (5, 15, 1, 90.0),
+        (0, 10, 0, 80.0),
+        (12, 20, 2, 100.0),
+        (12, 20, 3, 75.0),
+        (22, 25, 4, 100.0),
+    ]
+
+    assert FuzzyEntityExtractor._reconciliate_entities(hits) == [
+        (0, 10, 0, 80.0),
+        (12, 20, 2, 100.0),
+        (22, 25, 4, 100.0),
+    ]
+
+
+def test_prefilter_skips_unrelated_entity_types():
+    extractor = _create_test_entity_extractor()
+
+    assert extractor.prefilter.plausible_entity_types("xyz") == 0
+    assert extractor.prefilter.plausible_entity_types("pea") == 0b01
+    assert extractor.prefilter.plausible_entity_types("hug") == 0b10
+    assert extractor.prefilter.plausible_entity_types("pea hug") == 0b11
+    assert extractor.extract_entities(_create_message("xyz")) == []
+
+
+def test_prefilter_is_off_with_low_word_score_cutoff():
+    # No padded bigram in common, yet a QRatio of 62.5
+    assert fuzz.QRatio("abcde", "xaxbxcxdxex") == 62.5
+
+    extractor = _create_test_entity_extractor(
+        {**FuzzyEntityExtractor.get_default_config(), "word_score_cutoff": 60}
+    )
+    assert extractor.prefilter is None
+
+
+def test_batch_process_matches_process_message():
+    texts = [
+        "Hello world I like red and cyan. Olive is also good color. I would like a large milkshake",
+        "hi",
+        "I found out that lapis lazuli is a synonym for blue. I would like a swandich of consderble size",
+        "thanks",
+        "tiny and scarlet",
+    ]
+    extractor = _create_test_entity_extractor(
+        {**FuzzyEntityExtractor.get_default_config(), CONFIG_BATCH_SIZE: 2}
+    )
+
+    batch = [_create_message(text) for text in texts]
+    extractor.process(batch)
+
+    for text, message in zip(texts, batch):
+        expected = _create_message(text)
+        extractor.process_message(expected)
+        assert message.get("entities") == expected.get("entities")
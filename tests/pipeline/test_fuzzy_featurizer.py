@@ -0,0 +1,123 @@
+from typing import Text, Dict, Any, Optional
+
+from rasa.engine.graph import ExecutionContext
+from rasa.nlu.constants import TOKENS_NAMES
+from rasa.nlu.tokenizers.whitespace_tokenizer import WhitespaceTokenizer
+from rasa.shared.nlu.constants import TEXT
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+from pipeline.fuzzy_featurizer import (
+    FuzzyFeaturizer,
+    CONFIG_TRAINING_CACHE,
+    CONFIG_TRAINING_CACHE_DIRECTORY,
+)
+
+
+def _create_message(text: Text) -> Message:
+    tokenizer = WhitespaceTokenizer(WhitespaceTokenizer.get_default_config())
+    message = Message.build(text)
+    message.set(TOKENS_NAMES[TEXT], tokenizer.tokenize(message, TEXT))
+    return message
+
+
+def _create_featurizer(config: Optional[Dict[Text, Any]] = None) -> FuzzyFeaturizer:
+    return FuzzyFeaturizer(
+        {**FuzzyFeaturizer.get_default_config(), **(config or {})},
+        object(),
+        object(),
+        ExecutionContext(object(), node_name="fuzzy_featurizer"),
+        [
+            {"name": "color", "elements": ["red", "green", "blue"]},
+            {"name": "size", "elements": ["big", "small"]},
+        ],
+    )
+
+
+def _dense_features(message: Message):
+    return [
+        (sequence.toarray().tolist(), sentence.toarray().tolist())
+        for _, sequence, sentence in message.features
+    ]
+
+
+def test_features_for_fuzzy_entities():
+    featurizer = _create_featurizer()
+    message = _create_message("I want a big gren car")
+
+    featurizer.process([message])
+
+    color, size = _dense_features(message)
+    assert color == (
+        [[0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 1, 0], [0, 0, 0]],
+        [[0, 1, 0]],
+    )
+    assert size == ([[0, 0], [0, 0], [0, 0], [1, 0], [0, 0], [0, 0]], [[1, 0]])
+
+
+def test_features_without_matches_keep_their_shape():
+    featurizer = _create_featurizer()
+    message = _create_message("hello world")
+
+    featurizer.process([message])
+
+    color, size = _dense_features(message)
+    assert color == ([[0, 0, 0], [0, 0, 0]], [[0, 0, 0]])
+    assert size == ([[0, 0], [0, 0]], [[0, 0]])
+
+
+def test_process_training_data_matches_process_message(capsys):
+    featurizer = _create_featurizer({CONFIG_TRAINING_CACHE: False})
+    texts = ["a small blue house", "Big Red dog", "nothing here", "smal bleu"]
+
+    batched = [_create_message(text) for text in texts]
+    featurizer.process_training_data(TrainingData(training_examples=batched))
+
+    for text, batched_message in zip(texts, batched):
+        message = _create_message(text)
+        featurizer.process_message(message, TEXT)
+        assert _dense_features(message) == _dense_features(batched_message)
+
+    assert capsys.readouterr().out == ""
+
+
+def test_training_cache_reuses_hits(tmp_path, monkeypatch):
+    config = {
+        CONFIG_TRAINING_CACHE: True,
+        CONFIG_TRAINING_CACHE_DIRECTORY: str(tmp_path),
+    }
+    texts = ["a small blue house", "Big Red dog", "nothing here"]
+
+    first = [_create_message(text) for text in texts]
+    _create_featurizer(config).process_training_data(
+        TrainingData(training_examples=first)
+    )
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    featurizer = _create_featurizer(config)
+
+    def _fail(*args):
+        raise AssertionError("Cached examples should not be scored again")
+
+    monkeypatch.setattr(featurizer, "_find_fuzzy_entities", _fail)
+    second = [_create_message(text) for text in texts]
+    featurizer.process_training_data(TrainingData(training_examples=second))
+
+    for first_message, second_message in zip(first, second):
+        assert _dense_features(first_message) == _dense_features(second_message)
+
+    # Another lookup table gets its own cache file
+    other = _create_featurizer(config)
+    other.know_fuzzy_entities = [{"name": "size", "elements": ["big"]}]
+    other.process_training_data(
+        TrainingData(training_examples=[_create_message("big dog")])
+    )
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_training_cache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _create_featurizer().process_training_data(
+        TrainingData(training_examples=[_create_message("a small blue house")])
+    )
+    assert list(tmp_path.iterdir()) == []